@@ -1,94 +1,310 @@
-from flask import Flask, render_template, jsonify, request
-import pandas as pd
+from flask import Flask, render_template, jsonify, request, abort, make_response, g
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import numpy as np
 from datetime import datetime, timedelta
-import joblib
 import os
 import json
 from utils.data_processing import DataProcessor
+from utils.forecasting import ForecastEngine, build_lag_matrix
+from utils.results_cache import ResultsCache
+from utils.data_store import SensorDataStore
+from utils.kpi import KPIAccumulator, parse_window
+from utils.health import HealthScoreTracker
+from utils.rolling_features import StreamingFeatureEngine
+from utils.spc import StreamingSPC
+from utils.model_registry import ModelRegistry, ModelPool
+from utils.assets import AssetRegistry, StreamScheduler, load_asset_ids, DEFAULT_ASSET
+from utils.shared_state import SharedState, follow
+from utils.ingestion import load_dataset, data_source
+from utils.downsampling import DownsamplingPyramid
+from utils.fast_forest import CompiledForest, CompiledBoosters
+from utils.breakdown import BreakdownHistory
+from utils.responses import JSON_MIMETYPE, choose_encoding, encode, make_etag
+from utils.metrics import REGISTRY, HTTP_LATENCY, HTTP_RESPONSE_SIZE, MODEL_LATENCY, SamplingProfiler
+import hmac
 import threading
 import time
+import uuid
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
+socketio = SocketIO(app, async_mode='threading')
 
 class PredictiveMaintenanceApp:
-    def __init__(self):
+    def __init__(self, asset_id=DEFAULT_ASSET, model_pool=None, dataset=None, scheduler=None, start_index=250):
+        """
+        Monitoring state for one asset stream.
+        Streams share the model pool, the read-only dataset and the scheduler
+        that advances them; each keeps its own cursor, engines and results.
+        """
+        self.asset_id = asset_id
+        self.scheduler = scheduler if scheduler is not None else StreamScheduler(max_workers=1)
         self.data_processor = DataProcessor()
-        self.current_index = 250  # Start with first 100 rows
-        self.simulation_active = False
+        self.start_index = start_index  # Rows revealed before the simulation starts
+        self._simulation_active = False
+        self._sync_lock = threading.Lock()
         self.simulation_interval = 5  # seconds
-        self.load_models()
-        self.load_data()
+        self.results = ResultsCache()
+        self.listeners = []  # callables receiving (event, payload) pushes
+        # Breakdown model inputs, in training order
+        self.breakdown_features = [
+            '310A_FI_4303', '310A_DI_3302', '310A_PI_0316', '310A_PI_0325',
+            '310A_PI_0578', '310A_PI_0580', '310A_FI_4301', '310ASP01DI01SPM',
+            '310ASP01SI01SPM', '310A_TI_5303_D', '310A_TI_5304_D', '310A_PDI_0308'
+        ]
+        self.load_models(model_pool)
+        self.load_data(dataset)
+        self.init_engines()
+        self.precompute_results()
         
-    def load_data(self):
-        """Load the CSV data"""
+    def read_dataset(self):
+        """Load the CSV data into a columnar store with nothing revealed"""
+        return read_dataset(self.data_processor)
+
+    def load_data(self, dataset=None):
+        """Open this stream's cursor over the shared dataset"""
+        if dataset is None:
+            dataset = self.read_dataset()
+        self.store = dataset.fork(cursor=self.start_index, asset_id=self.asset_id)
+        self._synced = self.store.cursor
+
+    @property
+    def current_index(self):
+        """Rows this stream's engines have consumed; may trail a shared cursor until sync()"""
+        return self._synced
+
+    @property
+    def simulation_active(self):
+        if self.store.shared:
+            return self.store.running
+        return self._simulation_active
+
+    @simulation_active.setter
+    def simulation_active(self, active):
+        if self.store.shared:
+            self.store.set_running(active, self.simulation_interval)
+        else:
+            self._simulation_active = active
+
+    @property
+    def total_rows(self):
+        return self.store.total_rows
+            
+    def load_models(self, model_pool=None):
+        """Use the shared model pool, loading the models in parallel if there is none yet"""
+        if model_pool is None:
+            model_pool = load_model_pool()
+        self.model_pool = model_pool
+        self.model_registry = model_pool.registry
+        self.models = model_pool.models
+    
+    def init_engines(self):
+        """Prime the incremental engines with the rows revealed so far"""
+        snapshot = self.get_current_data()
+        # Engines are sized to the revealed rows and grow as more are revealed, not to the whole history
+        self.kpi_accumulator = KPIAccumulator(
+            self.data_processor.fault_columns,
+            sample_hours=self.store.interval.total_seconds() / 3600,
+            capacity=len(snapshot)
+        )
+        self.kpi_accumulator.extend(snapshot.matrix(self.data_processor.fault_columns))
+
+        self.health_tracker = HealthScoreTracker(len(self.data_processor.feature_columns), capacity=len(snapshot))
+        self.health_tracker.extend(
+            snapshot.matrix(self.data_processor.feature_columns),
+            snapshot.matrix(self.data_processor.fault_columns)
+        )
+
+        self.feature_engine = StreamingFeatureEngine(self.data_processor.feature_columns)
+        self.feature_engine.prime(snapshot.matrix(self.data_processor.feature_columns))
+
+        self.spc = StreamingSPC(self.data_processor.feature_columns, capacity=len(snapshot))
+        self.spc.extend(snapshot.matrix(self.data_processor.feature_columns))
+
+        self.chart_columns = self.data_processor.feature_columns + self.data_processor.fault_columns
+        self.pyramid = DownsamplingPyramid(len(self.chart_columns), capacity=len(snapshot))
+        self.pyramid.prime(snapshot.matrix(self.chart_columns))
+
+        self.init_breakdown_engine(snapshot)
+        self.init_forecast_engine(snapshot)
+
+    def init_forecast_engine(self, snapshot):
+        """Prime the recursive forecaster with the rows revealed so far"""
+        self.forecast_engine = None
+        if self.store.total_rows == 0 or 'scaler' not in self.models['forecast']:
+            return
+        forecast = self.models['forecast']
+        history = snapshot.matrix(self.data_processor.feature_columns)
+
+        def compile_boosters():
+            engine = CompiledBoosters(forecast, self.data_processor.feature_columns)
+            verified = engine.verify(build_lag_matrix(forecast['scaler'].transform(history)))
+            if not verified:
+                print("Compiled forecast models disagree with XGBoost, using XGBoost")
+            return engine, verified
+
+        compiled = None
         try:
-            self.df = pd.read_csv('data/Cleared_df0.csv')
-            # Add timestamp for simulation
-            base_time = datetime.now() - timedelta(hours=len(self.df))
-            self.df['timestamp'] = [base_time + timedelta(hours=2*i) for i in range(len(self.df))]
-            self.total_rows = len(self.df)
-            print(f"Loaded {self.total_rows} rows of data")
+            # Compiled once and shared by every stream
+            engine, verified = self.model_pool.derived('forecast_engine', compile_boosters)
+            compiled = engine if verified else None
         except Exception as e:
-            print(f"Error loading data: {e}")
-            self.df = pd.DataFrame()
-            
-    def load_models(self):
-        """Load pre-trained models"""
-        self.models = {
-            'breakdown': {},
-            'forecast': {}
-        }
-        
-        # Load breakdown prediction models
+            print(f"Error compiling forecast models: {e}")
         try:
-            breakdown_path = 'models/Breakdown/'
-            if os.path.exists(f'{breakdown_path}rf_model.joblib'):
-                self.models['breakdown']['rf'] = joblib.load(f'{breakdown_path}rf_model.joblib')
-            if os.path.exists(f'{breakdown_path}nn_model.joblib'):
-                self.models['breakdown']['nn'] = joblib.load(f'{breakdown_path}nn_model.joblib')
-            if os.path.exists(f'{breakdown_path}scaler.joblib'):
-                self.models['breakdown']['scaler'] = joblib.load(f'{breakdown_path}scaler.joblib')
+            self.forecast_engine = ForecastEngine(
+                forecast,
+                forecast['scaler'],
+                self.data_processor.feature_columns,
+                compiled=compiled
+            )
+            self.forecast_engine.prime(history)
         except Exception as e:
-            print(f"Error loading breakdown models: {e}")
-            
-        # Load forecasting models
+            print(f"Error initialising forecast engine: {e}")
+            self.forecast_engine = None
+
+    def init_breakdown_engine(self, snapshot):
+        """
+        Compile the breakdown forest, keeping it only if it agrees with sklearn on the history,
+        and backfill the probability history for the rows revealed so far
+        """
+        self.breakdown_engine = None
+        self.breakdown_history = None
+        breakdown = self.models['breakdown']
+        if 'rf' not in breakdown or 'scaler' not in breakdown:
+            return
+        history = snapshot.matrix(self.breakdown_features)
+
+        def compile_forest():
+            engine = CompiledForest(breakdown['rf'], breakdown['scaler'], group='breakdown')
+            verified = engine.verify(history)
+            if not verified:
+                print("Compiled breakdown forest disagrees with sklearn, using sklearn")
+            return engine, verified
+
         try:
-            forecast_path = 'models/Forecast/'
-            forecast_files = [f for f in os.listdir(forecast_path) if f.endswith('.joblib')]
-            for file in forecast_files:
-                model_name = file.replace('.joblib', '')
-                self.models['forecast'][model_name] = joblib.load(f'{forecast_path}{file}')
+            # Compiled once and shared by every stream
+            engine, verified = self.model_pool.derived('breakdown_engine', compile_forest)
+            if verified:
+                self.breakdown_engine = engine
+                scorer = engine.predict_proba
+            else:
+                scorer = engine.reference_proba
+            self.breakdown_history = BreakdownHistory(self.data_processor.fault_columns, scorer,
+                                                      capacity=len(history))
+            self.breakdown_history.extend(history)
         except Exception as e:
-            print(f"Error loading forecast models: {e}")
-    
+            print(f"Error compiling breakdown forest: {e}")
+
+    def swap_models(self, model_pool):
+        """Switch to another model pool, rebuilding the engines that depend on the models"""
+        with self._sync_lock:
+            self.load_models(model_pool)
+            snapshot = self.get_current_data()
+            self.init_breakdown_engine(snapshot)
+            self.init_forecast_engine(snapshot)
+            # Results computed with the previous models must not be served again
+            self.results = ResultsCache()
+            self.precompute_results()
+
+    def update_engines(self, snapshot, index=-1):
+        """Feed one revealed row to the incremental engines"""
+        faults = snapshot.row(index, self.data_processor.fault_columns)
+        self.kpi_accumulator.append(faults)
+        values = snapshot.row(index, self.data_processor.feature_columns)
+        self.health_tracker.append(values, faults)
+        self.feature_engine.append(values)
+        self.spc.update(values)
+        self.pyramid.append(snapshot.row(index, self.chart_columns))
+        if self.breakdown_history is not None:
+            self.breakdown_history.append(snapshot.row(index, self.breakdown_features))
+        if self.forecast_engine is not None:
+            self.forecast_engine.append(values)
+
+    def sync(self):
+        """
+        Feed the rows revealed since the last sync to the engines and republish results.
+        Returns whether anything new was consumed.
+        """
+        if self.store.cursor <= self._synced:
+            return False
+        with self._sync_lock:
+            target = self.store.cursor
+            if target <= self._synced:
+                return False
+            snapshot = self.store.snapshot(target)
+            for index in range(self._synced, target):
+                self.update_engines(snapshot, index)
+            self._synced = target
+            try:
+                self.precompute_results()
+            except Exception as e:
+                print(f"Error precomputing results: {e}")
+        return True
+
     def get_current_data(self):
-        """Get data up to current index"""
-        if self.df.empty:
-            return pd.DataFrame()
-        return self.df.iloc[:self.current_index].copy()
+        """Get a zero-copy snapshot of the data up to current index"""
+        return self.store.snapshot(self._synced)
     
+    def get_data_since(self, since):
+        """
+        Columnar slice of the rows revealed after `since`.
+
+        Timestamps are sent as a base plus a fixed interval instead of one
+        string per row, so the payload only grows with the number of new rows.
+        """
+        snapshot = self.get_current_data()
+        payload = self._delta_header(snapshot, since)
+        payload['parameters'] = {col: snapshot.column(col, payload['start']) for col in payload['columns']}
+        return payload
+
+    def get_packed_data_since(self, since):
+        """Same slice as get_data_since, packed as column-major float32 bytes"""
+        snapshot = self.get_current_data()
+        payload = self._delta_header(snapshot, since)
+        values = np.empty((len(payload['columns']), payload['end'] - payload['start']), dtype=np.float32)
+        for i, col in enumerate(payload['columns']):
+            values[i] = snapshot.column(col, payload['start'])
+        return payload, values.tobytes()
+
+    def _delta_header(self, snapshot, since):
+        end = len(snapshot)
+        start = min(max(since, 0), end)
+        return {
+            'start': start,
+            'end': end,
+            'base_timestamp': snapshot.timestamp(start).strftime('%Y-%m-%d %H:%M:%S'),
+            'interval_seconds': int(self.store.interval.total_seconds()),
+            'columns': list(snapshot.columns)
+        }
+
     def predict_next_values(self, steps=10):
-        """Predict next values for key parameters"""
-        predictions = {}
-        current_data = self.get_current_data()
-        
-        if current_data.empty:
-            return predictions
-            
-        # Key parameters to predict
-        key_params = [
-            '310A_FI_4303', '310A_DI_3302', '310A_PI_0316', '310A_PI_0325',
-            '310A_PI_0578', '310A_PI_0580', '310A_FI_4301', '310ASP01DI01SPM',
-            '310ASP01SI01SPM', '310A_TI_5303_D', '310A_TI_5304_D', '310A_PDI_0308'
-        ]
-        scaler=self.models['forecast']['scaler']
-        
-        predictions= DataProcessor.XGBoost_forecast(current_data.drop(columns=['faulty_SP','faulty_VP','faulty_TK','timestamp']),self.models['forecast'],key_params,scaler)
+        """Predict the next `steps` values for key parameters"""
+        if self.forecast_engine is None or self.current_index == 0:
+            return []
+
+        predictions = self.forecast_engine.forecast(steps)
         serializable_data = [[k, v.tolist()] for k, v in predictions.items()]
         return serializable_data
     
+    def forecast_payload(self, steps=10):
+        """Predictions for the next `steps` rows together with their timestamps"""
+        predictions = self.predict_next_values(steps)
+
+        # Generate future timestamps
+        current_data = self.get_current_data()
+        if not current_data.empty:
+            last_timestamp = current_data.timestamp(-1)
+            # Rows are two hours apart, so forecast steps are too
+            future_timestamps = [(last_timestamp + timedelta(hours=2*(i+1))).strftime('%Y-%m-%d %H:%M:%S') 
+                               for i in range(steps)]
+        else:
+            future_timestamps = []
+
+        return {
+            'timestamps': future_timestamps,
+            'predictions': predictions
+        }
+
     def predict_breakdown(self):
         """Predict breakdown probability"""
         current_data = self.get_current_data()
@@ -100,21 +316,31 @@ class PredictiveMaintenanceApp:
                 'faulty_VP': 0.1
             }
         
+        # The latest row has already been scored into the probability history
+        if self.breakdown_history is not None and self.breakdown_history.count == len(current_data):
+            probabilities = self.breakdown_history.probabilities(len(current_data) - 1)[0]
+            return dict(zip(self.breakdown_history.outputs, probabilities.tolist()))
+
         # Use last row features for prediction
-        latest_features = current_data.iloc[-1][[
-            '310A_FI_4303', '310A_DI_3302', '310A_PI_0316', '310A_PI_0325',
-            '310A_PI_0578', '310A_PI_0580', '310A_FI_4301', '310ASP01DI01SPM',
-            '310ASP01SI01SPM', '310A_TI_5303_D', '310A_TI_5304_D', '310A_PDI_0308'
-        ]].values.reshape(1, -1)
+        latest_features = current_data.row(-1, self.breakdown_features).reshape(1, -1)
         
         try:
+            if self.breakdown_engine is not None:
+                probabilities = self.breakdown_engine.predict_proba(latest_features)[0]
+                return {
+                    'faulty_SP': float(probabilities[0]),
+                    'faulty_TK': float(probabilities[1]),
+                    'faulty_VP': float(probabilities[2])
+                }
             if 'scaler' in self.models['breakdown']:
-                scaled_features = self.models['breakdown']['scaler'].transform(latest_features)
+                with MODEL_LATENCY.time(group='breakdown', model='scaler', stage='transform'):
+                    scaled_features = self.models['breakdown']['scaler'].transform(latest_features)
                 
                 predictions = {}
                 if 'rf' in self.models['breakdown']:
                     # Assume Random Forest predicts  three fault types
-                    rf_pred = self.models['breakdown']['rf'].predict_proba(scaled_features)
+                    with MODEL_LATENCY.time(group='breakdown', model='rf', stage='predict'):
+                        rf_pred = self.models['breakdown']['rf'].predict_proba(scaled_features)
                     rf_pred = np.array(rf_pred)
                     predictions = {
                         'faulty_SP': float(np.array(rf_pred[0][0][1])) ,
@@ -132,34 +358,21 @@ class PredictiveMaintenanceApp:
             'faulty_VP': 0
         }
     
-    def calculate_kpis(self, equipment=None):
+    def calculate_kpis(self, equipment=None, window_hours=None):
         """
         Calculate KPIs for each component or a specific one.
         If equipment is None or 'all', returns KPIs for all components.
+        window_hours restricts the KPIs to the most recent hours of data.
         """
-        current_data = self.get_current_data()
-        if current_data.empty:
+        if self.current_index == 0:
             return {}
 
-        fault_columns = ['faulty_SP', 'faulty_TK', 'faulty_VP']
         kpi_results = {}
+        start, end = self.kpi_accumulator.window_bounds(window_hours)
 
         # Helper to calculate KPIs for a single component
         def kpi_for_component(fault_col):
-            total_faults = current_data[fault_col].sum()
-            operating_hours = len(current_data)*2
-            mtbf = operating_hours / max(1, total_faults)
-            mttr = 0.25  # Assume 2 hours average repair time
-            availability = (operating_hours - total_faults * mttr) / operating_hours * 100
-            reliability = ((operating_hours - total_faults) / operating_hours) * 100
-            return {
-                'MTBF': round(mtbf, 2),
-                'MTTR': round(mttr, 2),
-                'Availability': round(max(0, availability), 2),
-                'Reliability': round(max(0, reliability), 2),
-                'Total_Faults': int(total_faults),
-                'Operating_Hours': operating_hours
-            }
+            return self.kpi_accumulator.kpis(fault_col, start, end)
 
         # Map equipment value to fault column
         equipment_map = {
@@ -180,124 +393,630 @@ class PredictiveMaintenanceApp:
             else:
                 return {}
 
+    def get_health_scores(self, start=None, end=None):
+        """
+        Equipment health scores from the streaming tracker.
+        Without a range only the latest score is returned.
+        """
+        count = self.health_tracker.count
+        if start is None and end is None:
+            start = max(0, count - 1)
+        start = 0 if start is None else start
+        scores = self.health_tracker.scores(start, end)
+        return {
+            'start': min(max(start, 0), count),
+            'end': min(max(start, 0), count) + len(scores),
+            'scores': scores.round(2).tolist(),
+            'latest': round(float(scores[-1]), 2) if len(scores) else None
+        }
+
+    def get_chart_data(self, start=None, end=None, max_points=None, method='lttb'):
+        """
+        Chart series for rows [start, end), downsampled to about max_points per series
+        (MAX_CHART_POINTS when not given, so a response is always bounded).
+        method='lttb' picks representative points, 'minmax' returns min/max/mean buckets;
+        ranges that already fit are returned raw.
+        """
+        max_points = MAX_CHART_POINTS if max_points is None else max_points
+        snapshot = self.get_current_data()
+        end = len(snapshot) if end is None else min(max(end, 0), len(snapshot))
+        start = 0 if start is None else min(max(start, 0), end)
+        columns = [col for col in self.chart_columns if col in snapshot.columns]
+        fmt = '%Y-%m-%d %H:%M:%S'
+
+        def raw(lo, hi):
+            return snapshot.matrix(columns, lo, hi)
+
+        data = {'start': start, 'end': end, 'method': 'raw', 'parameters': {}}
+        if method == 'minmax':
+            summary = self.pyramid.buckets(start, end, max_points, raw)
+            if summary is not None:
+                data.update({
+                    'method': 'minmax',
+                    'index': summary['start'].tolist(),
+                    'count': (summary['end'] - summary['start']).tolist(),
+                    'timestamps': snapshot.timestamps_at(summary['start']).strftime(fmt).tolist()
+                })
+                for i, col in enumerate(columns):
+                    data['parameters'][col] = {
+                        'min': summary['min'][:, i].tolist(),
+                        'max': summary['max'][:, i].tolist(),
+                        'mean': summary['mean'][:, i].tolist()
+                    }
+                return data
+        else:
+            indices = self.pyramid.lttb(start, end, max_points, raw)
+            if indices is not None:
+                data['method'] = 'lttb'
+                for i, col in enumerate(columns):
+                    index = np.unique(indices[i])
+                    data['parameters'][col] = {
+                        'index': index.tolist(),
+                        'timestamps': snapshot.timestamps_at(index).strftime(fmt).tolist(),
+                        'values': snapshot.column(col)[index].tolist()
+                    }
+                return data
+
+        data['timestamps'] = snapshot.timestamps(start, end).strftime(fmt).tolist()
+        for col in columns:
+            data['parameters'][col] = snapshot.column(col, start, end).tolist()
+        return data
+
+    def get_breakdown_history(self, start=None, end=None):
+        """Breakdown probabilities for a range of rows from the backfilled history"""
+        if self.breakdown_history is None:
+            return {'start': 0, 'end': 0, 'timestamps': [], 'probabilities': {}}
+        count = self.breakdown_history.count
+        start = min(max(0 if start is None else start, 0), count)
+        probabilities = self.breakdown_history.probabilities(start, end)
+        snapshot = self.get_current_data()
+        return {
+            'start': start,
+            'end': start + len(probabilities),
+            'timestamps': snapshot.timestamps(start, start + len(probabilities)).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            'probabilities': {
+                output: probabilities[:, i].tolist()
+                for i, output in enumerate(self.breakdown_history.outputs)
+            }
+        }
+
+    def get_latest_features(self):
+        """Rolling statistical features of the most recent row"""
+        return {
+            'index': self.feature_engine.count,
+            'window_sizes': self.feature_engine.window_sizes,
+            # Rate of change is infinite after a zero reading, which JSON cannot carry
+            'features': {name: (value if np.isfinite(value) else None)
+                         for name, value in self.feature_engine.latest_features().items()}
+        }
+
+    def get_control_chart(self, parameter=None, points=30, usl=None, lsl=None):
+        """
+        SPC state from the streaming engine.
+        For a single parameter the most recent points and their signal flags are included.
+        """
+        if parameter is None:
+            return {param: self.spc.state(param) for param in self.spc.columns}
+        if parameter not in self.spc.columns:
+            return {}
+
+        snapshot = self.get_current_data()
+        start = max(0, len(snapshot) - points)
+        chart = self.spc.state(parameter, usl, lsl)
+        chart.update({
+            'start': start,
+            'data': snapshot.column(parameter, start).tolist(),
+            'timestamps': snapshot.timestamps(start).strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            'out_of_control': self.spc.flags(parameter, start, len(snapshot)).tolist()
+        })
+        return chart
+
+    def cached(self, key, compute):
+        """Read a result for the current index from the cache, computing it on a miss"""
+        return self.results.get(self.current_index, key, compute)
+
+    def precompute_results(self):
+        """Compute the results the dashboard polls for and publish them for the current index"""
+        index = self.current_index
+        results = {
+            ('predictions', 10): self.forecast_payload(10),
+            ('breakdown',): self.predict_breakdown()
+        }
+        for equipment in ['all', 'sp', 'tk', 'vp']:
+            results[('kpis', equipment, None)] = self.calculate_kpis(equipment)
+        self.results.publish(index, results)
+
+    def simulation_status(self):
+        """Current simulation state"""
+        return {
+            'asset_id': self.asset_id,
+            'active': self.simulation_active,
+            'current_index': self.current_index,
+            'total_rows': self.total_rows,
+            'progress': (self.current_index / self.total_rows * 100) if self.total_rows > 0 else 0
+        }
+
+    def tick_message(self):
+        """Compact delta describing the row revealed by the latest tick"""
+        snapshot = self.get_current_data()
+        features = self.data_processor.feature_columns
+        faults = self.data_processor.fault_columns
+        values = dict(zip(features, snapshot.row(-1, features).tolist()))
+        values.update(zip(faults, snapshot.row(-1, faults).astype(int).tolist()))
+
+        message = self.simulation_status()
+        message.update({
+            'timestamp': snapshot.timestamp(-1).strftime('%Y-%m-%d %H:%M:%S'),
+            'row': values,
+            'breakdown': self.cached(('breakdown',), self.predict_breakdown),
+            'kpis': self.cached(('kpis', 'all', None), lambda: self.calculate_kpis('all')),
+            'predictions': self.cached(('predictions', 10), lambda: self.forecast_payload(10))
+        })
+        return message
+
+    def notify(self, event, payload):
+        """Push an event to every registered listener"""
+        for listener in self.listeners:
+            try:
+                listener(event, payload)
+            except Exception as e:
+                print(f"Error notifying listener: {e}")
+
     def start_simulation(self):
         """Start real-time simulation"""
-        if not self.simulation_active:
+        if not self.simulation_active and self.current_index < self.total_rows:
             self.simulation_active = True
-            simulation_thread = threading.Thread(target=self._simulation_loop)
-            simulation_thread.daemon = True
-            simulation_thread.start()
+            # With shared state the owner process advances the cursor instead
+            if not self.store.shared:
+                self.scheduler.schedule(self)
+            self.notify('simulation_status', self.simulation_status())
     
     def stop_simulation(self):
         """Stop real-time simulation"""
         self.simulation_active = False
+        self.scheduler.cancel(self)
+        self.notify('simulation_status', self.simulation_status())
     
-    def _simulation_loop(self):
-        """Simulation loop that adds new data points"""
-        while self.simulation_active and self.current_index < self.total_rows:
-            time.sleep(self.simulation_interval)
-            self.current_index += 1
-            if self.current_index >= self.total_rows:
-                self.simulation_active = False
-                break
+    def tick(self):
+        """Reveal the next data point; called by the scheduler, returns whether to keep going"""
+        if not self.simulation_active or self.current_index >= self.total_rows:
+            return False
+        self.store.advance()
+        self.sync()
+        if self.current_index >= self.total_rows:
+            self.simulation_active = False
+        self.notify('tick', self.tick_message())
+        return self.simulation_active
+
+def read_dataset(data_processor):
+    """Open the sensor history (PM_DATA_PATH) as a columnar store with nothing revealed"""
+    columns = data_processor.feature_columns + data_processor.fault_columns
+    sample_interval = timedelta(hours=2)
+    path, cache_dir = data_source()
+    try:
+        dataset = load_dataset(path, columns, sample_interval, cache_dir)
+        print(f"Loaded {dataset.total_rows} rows of data")
+        return dataset
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return SensorDataStore.empty(columns, datetime.now(), sample_interval)
+
+def attach_socket(stream):
+    """Push a stream's events over Socket.IO"""
+    # The default asset broadcasts to every dashboard, other assets to their room
+    room = None if stream.asset_id == DEFAULT_ASSET else stream.asset_id
+    stream.listeners.append(lambda event, payload: socketio.emit(event, payload, to=room))
+    return stream
+
+def load_model_pool():
+    """Load the current model versions in parallel"""
+    registry = ModelRegistry('models', mmap_mode=os.environ.get('PM_MODEL_MMAP') or None)
+    registry.load()
+    return ModelPool(registry)
+
+def create_stream(asset_id):
+    """Build the stream for one asset on the shared models, dataset and scheduler"""
+    return attach_socket(PredictiveMaintenanceApp(asset_id, model_pool, dataset, scheduler))
 
 # Initialize the application
-pm_app = PredictiveMaintenanceApp()
+# Under gunicorn (see gunicorn.conf.py) the history and cursors live in shared memory
+shared_state = SharedState.attach(os.environ['PM_SHARED_STATE']) if os.environ.get('PM_SHARED_STATE') else None
+scheduler = StreamScheduler(max_workers=int(os.environ.get('PM_STREAM_WORKERS', 4)))
+pm_app = PredictiveMaintenanceApp(
+    DEFAULT_ASSET, dataset=shared_state.dataset if shared_state else None, scheduler=scheduler
+)
+model_pool = pm_app.model_pool
+dataset = shared_state.dataset if shared_state else pm_app.store.fork()
+asset_ids = shared_state.asset_ids if shared_state else load_asset_ids()
+assets = AssetRegistry(create_stream, asset_ids, default=DEFAULT_ASSET)
+assets.add(DEFAULT_ASSET, attach_socket(pm_app))
+if shared_state:
+    follow(assets)
+
+# Upper bound on points per series for downsampled chart requests
+MAX_CHART_POINTS = 5000
+# Longest forecast horizon served, in rows (20 days at two hours per row)
+MAX_FORECAST_STEPS = 240
+
+# Off until toggled through /api/metrics/profile, or from start-up with PM_PROFILER=1
+profiler = SamplingProfiler(float(os.environ.get('PM_PROFILER_INTERVAL', 0.01)))
+if os.environ.get('PM_PROFILER'):
+    profiler.start()
+
+def collect_stream_metrics():
+    """Cache, cursor and scheduler state of the streams, read at scrape time"""
+    families = {
+        'hits': ('pm_results_cache_hits_total', 'counter', 'Result cache hits per stream.'),
+        'misses': ('pm_results_cache_misses_total', 'counter', 'Result cache misses per stream.'),
+        'evictions': ('pm_results_cache_evictions_total', 'counter', 'Results dropped to keep the cache bounded.'),
+        'hit_rate': ('pm_results_cache_hit_ratio', 'gauge', 'Share of result reads served from the cache.'),
+        'index': ('pm_stream_index', 'gauge', 'Rows revealed to the stream.'),
+        'lag': ('pm_stream_sync_lag_rows', 'gauge', 'Rows the stream cursor is ahead of its engines.'),
+        'active': ('pm_stream_simulation_active', 'gauge', 'Whether the stream simulation is running.')
+    }
+    samples = {key: [] for key in families}
+    for asset_id, stream in sorted(assets.streams().items()):
+        labels = {'asset': asset_id}
+        stats = stream.results.stats()
+        for key in ('hits', 'misses', 'evictions', 'hit_rate'):
+            samples[key].append((labels, stats[key]))
+        samples['index'].append((labels, stream.current_index))
+        samples['lag'].append((labels, stream.store.cursor - stream.current_index))
+        samples['active'].append((labels, int(stream.simulation_active)))
+    return [families[key] + (samples[key],) for key in families] + [
+        ('pm_simulation_scheduled_streams', 'gauge', 'Streams with a pending tick.', [({}, scheduler.running())]),
+        ('pm_profiler_samples', 'gauge', 'Samples held by the sampling profiler.', [({}, profiler.samples)])
+    ]
+
+REGISTRY.add_collector(collect_stream_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Latency and response size per route template"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, method=request.method, route=route,
+                             status=response.status_code)
+        if not response.is_streamed:
+            HTTP_RESPONSE_SIZE.observe(response.calculate_content_length() or 0, method=request.method, route=route)
+    return response
+
+def get_stream(asset_id=None):
+    """Stream for the asset in the URL, or the default asset"""
+    if asset_id is not None and asset_id not in assets:
+        abort(make_response(jsonify({'error': f"Unknown asset '{asset_id}'"}), 404))
+    stream = assets.get(asset_id)
+    # Catch up with a cursor advanced by another process
+    stream.sync()
+    return stream
+
+# Part of every ETag, so validators from another dataset load never match;
+# gunicorn workers share the segment name and therefore their ETags
+ETAG_SEED = shared_state.name if shared_state else uuid.uuid4().hex
+
+def stream_response(stream, key, build):
+    """
+    JSON response for the stream's current index.
+    `key` identifies the response by the parsed parameters `build` depends on,
+    so unused or repeated query arguments neither change the ETag nor add cache entries.
+    Clients revalidating with a matching ETag get 304 without anything being
+    computed; otherwise the encoded, compressed body is cached until the next tick.
+    """
+    etag = make_etag(ETAG_SEED, stream.model_registry.version, stream.asset_id, stream.current_index, *key)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        encoding = choose_encoding(request.accept_encodings)
+        body, applied = stream.cached(('response',) + key + (encoding,), lambda: encode(build(), encoding))
+        response = app.response_class(body, mimetype=JSON_MIMETYPE)
+        if applied is not None:
+            response.content_encoding = applied
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def asset_route(rule, **options):
+    """Register an /api route for the default asset and under /api/assets/<asset_id>"""
+    def decorator(view):
+        app.add_url_rule(rule, view.__name__, view, defaults={'asset_id': None}, **options)
+        app.add_url_rule('/api/assets/<asset_id>' + rule[len('/api'):], view.__name__, view, **options)
+        return view
+    return decorator
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/current-data')
-def get_current_data():
-    """Get current historical data"""
-    current_data = pm_app.get_current_data()
-    
-    if current_data.empty:
+@asset_route('/api/current-data')
+def get_current_data(asset_id=None):
+    """
+    Get current historical data.
+    Query params: since=<index> returns only rows revealed after that index in
+    columnar form; format=float32 packs them as binary (metadata in X-Data-Meta).
+    start, end (row indices) and max_points (default and upper bound: MAX_CHART_POINTS)
+    limit the range and its size, with method=lttb (default) or minmax choosing how
+    ranges are downsampled.
+    JSON responses carry an ETag that changes with the stream's index
+    """
+    stream = get_stream(asset_id)
+    since = request.args.get('since', type=int)
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    max_points = request.args.get('max_points', type=int)
+    if since is None and (start is not None or end is not None or max_points is not None):
+        method = request.args.get('method', 'lttb')
+        if method not in ('lttb', 'minmax'):
+            return jsonify({'error': f'Unknown method {method}, expected lttb or minmax'}), 400
+        max_points = MAX_CHART_POINTS if max_points is None else min(max(max_points, 3), MAX_CHART_POINTS)
+        return stream_response(stream, ('chart', start, end, max_points, method),
+                               lambda: stream.get_chart_data(start, end, max_points, method))
+    if since is not None:
+        if stream.total_rows == 0:
+            return jsonify({'error': 'No data available'}), 404
+        if request.args.get('format') == 'float32':
+            meta, body = stream.get_packed_data_since(since)
+            response = app.response_class(body, mimetype='application/octet-stream')
+            response.headers['X-Data-Meta'] = json.dumps(meta)
+            return response
+        return stream_response(stream, ('since', since), lambda: stream.get_data_since(since))
+
+    if stream.get_current_data().empty:
         return jsonify({'error': 'No data available'}), 404
-    
-    # Convert to format suitable for charts
-    data = {
-        'timestamps': current_data['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-        'parameters': {}
-    }
-    
-    # Key parameters for visualization
-    key_params = [
-        '310A_FI_4303', '310A_DI_3302', '310A_PI_0316', '310A_PI_0325',
-        '310A_PI_0578', '310A_PI_0580', '310A_FI_4301', '310ASP01DI01SPM',
-        '310ASP01SI01SPM', '310A_TI_5303_D', '310A_TI_5304_D', '310A_PDI_0308'
-    ]
-    
-    for param in key_params:
-        if param in current_data.columns:
-            data['parameters'][param] = current_data[param].tolist()
-    
-    # Add fault data
-    fault_params = ['faulty_SP', 'faulty_TK', 'faulty_VP']
-    for param in fault_params:
-        if param in current_data.columns:
-            data['parameters'][param] = current_data[param].tolist()
-    
-    return jsonify(data)
 
-@app.route('/api/predictions')
-def get_predictions():
+    def build():
+        current_data = stream.get_current_data()
+        # Convert to format suitable for charts
+        data = {
+            'timestamps': current_data.timestamps().strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            'parameters': {}
+        }
+
+        # Key parameters for visualization
+        key_params = [
+            '310A_FI_4303', '310A_DI_3302', '310A_PI_0316', '310A_PI_0325',
+            '310A_PI_0578', '310A_PI_0580', '310A_FI_4301', '310ASP01DI01SPM',
+            '310ASP01SI01SPM', '310A_TI_5303_D', '310A_TI_5304_D', '310A_PDI_0308'
+        ]
+
+        for param in key_params:
+            if param in current_data.columns:
+                data['parameters'][param] = current_data.column(param)
+
+        # Add fault data
+        fault_params = ['faulty_SP', 'faulty_TK', 'faulty_VP']
+        for param in fault_params:
+            if param in current_data.columns:
+                data['parameters'][param] = current_data.column(param)
+        return data
+
+    return stream_response(stream, ('current-data',), build)
+
+@asset_route('/api/predictions')
+def get_predictions(asset_id=None):
     """Get predictions for next time steps"""
+    stream = get_stream(asset_id)
     steps = request.args.get('steps', 10, type=int)
-    predictions = pm_app.predict_next_values(steps)
-    
-    # Generate future timestamps
-    current_data = pm_app.get_current_data()
-    if not current_data.empty:
-        last_timestamp = current_data['timestamp'].iloc[-1]
-        future_timestamps = [(last_timestamp + timedelta(hours=i+1)).strftime('%Y-%m-%d %H:%M:%S') 
-                           for i in range(steps)]
-    else:
-        future_timestamps = []
-    
-    return jsonify({
-        'timestamps': future_timestamps,
-        'predictions': predictions
-    })
+    if not 1 <= steps <= MAX_FORECAST_STEPS:
+        return jsonify({'error': f'steps must be between 1 and {MAX_FORECAST_STEPS}'}), 400
+    key = ('predictions', steps)
+    return stream_response(stream, key, lambda: stream.cached(key, lambda: stream.forecast_payload(steps)))
 
-@app.route('/api/breakdown-prediction')
-def get_breakdown_prediction():
-    """Get breakdown probability predictions"""
-    predictions = pm_app.predict_breakdown()
+@asset_route('/api/breakdown-prediction')
+def get_breakdown_prediction(asset_id=None):
+    """
+    Get breakdown probability predictions.
+    Query params: start, end (row indices, optional); with either, the probability
+    history for that range is returned instead of the latest prediction
+    """
+    stream = get_stream(asset_id)
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    if start is None and end is None:
+        predictions = stream.cached(('breakdown',), stream.predict_breakdown)
+    else:
+        predictions = stream.cached(('breakdown', start, end), lambda: stream.get_breakdown_history(start, end))
     return jsonify(predictions)
 
-@app.route('/api/kpis')
-def get_kpis():
+@asset_route('/api/kpis')
+def get_kpis(asset_id=None):
     """
     Get KPI calculations for a specific equipment or all.
-    Query param: equipment=sp|tk|vp|all (default: all)
+    Query params: equipment=sp|tk|vp|all (default: all)
+                  window=<hours>h|<days>d|all (default: all)
     """
+    stream = get_stream(asset_id)
     equipment = request.args.get('equipment', 'all').lower()
-    kpis = pm_app.calculate_kpis(equipment)
-    return jsonify(kpis)
+    try:
+        window_hours = parse_window(request.args.get('window'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    key = ('kpis', equipment, window_hours)
+    return stream_response(stream, key, lambda: stream.cached(key,
+                                                              lambda: stream.calculate_kpis(equipment, window_hours)))
 
-@app.route('/api/simulation/start', methods=["POST"])
-def start_simulation():
+@asset_route('/api/health-score')
+def get_health_score(asset_id=None):
+    """
+    Get equipment health scores.
+    Query params: start, end (row indices, optional); without them only the latest score is returned
+    """
+    stream = get_stream(asset_id)
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    health = stream.cached(('health', start, end), lambda: stream.get_health_scores(start, end))
+    return jsonify(health)
+
+@asset_route('/api/features')
+def get_features(asset_id=None):
+    """Get the rolling statistical features of the latest row"""
+    stream = get_stream(asset_id)
+    return jsonify(stream.cached(('features',), stream.get_latest_features))
+
+@asset_route('/api/control-charts')
+def get_control_charts(asset_id=None):
+    """
+    Get control chart state (limits, moving range, EWMA, CUSUM, capability).
+    Query params: parameter (default: all), points (default: 30), usl, lsl
+    """
+    stream = get_stream(asset_id)
+    parameter = request.args.get('parameter')
+    points = request.args.get('points', 30, type=int)
+    usl = request.args.get('usl', type=float)
+    lsl = request.args.get('lsl', type=float)
+    chart = stream.cached(('control-charts', parameter, points, usl, lsl),
+                          lambda: stream.get_control_chart(parameter, points, usl, lsl))
+    if parameter is not None and not chart:
+        return jsonify({'error': f'Unknown parameter {parameter}'}), 404
+    return jsonify(chart)
+
+@asset_route('/api/anomalies')
+def get_anomalies(asset_id=None):
+    """
+    Get anomaly events raised by the streaming SPC rules.
+    Query params: since (row index, default: 0), parameter (optional), limit (default: 100)
+    """
+    stream = get_stream(asset_id)
+    since = request.args.get('since', 0, type=int)
+    parameter = request.args.get('parameter')
+    limit = request.args.get('limit', 100, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    anomalies = stream.cached(('anomalies', since, parameter, limit),
+                              lambda: stream.spc.anomalies(since, parameter, limit))
+    return jsonify({
+        'current_index': stream.current_index,
+        'anomalies': anomalies
+    })
+
+@asset_route('/api/simulation/start', methods=["POST"])
+def start_simulation(asset_id=None):
     """Start real-time simulation"""
-    pm_app.start_simulation()
+    stream = get_stream(asset_id)
+    stream.start_simulation()
     return jsonify({'status': 'Simulation started'})
 
-@app.route('/api/simulation/stop', methods=["POST"])
-def stop_simulation():
+@asset_route('/api/simulation/stop', methods=["POST"])
+def stop_simulation(asset_id=None):
     """Stop real-time simulation"""
-    pm_app.stop_simulation()
+    stream = get_stream(asset_id)
+    stream.stop_simulation()
     return jsonify({'status': 'Simulation stopped'})
 
-@app.route('/api/simulation/status')
-def simulation_status():
+@asset_route('/api/simulation/status')
+def simulation_status(asset_id=None):
     """Get simulation status"""
+    stream = get_stream(asset_id)
+    return jsonify(stream.simulation_status())
+
+@app.route('/api/models')
+def model_status():
+    """Loaded models and their startup load times"""
+    return jsonify(model_pool.registry.stats())
+
+model_reload_lock = threading.Lock()
+# Bearer token for administrative routes; they are disabled when it is not configured
+ADMIN_TOKEN = os.environ.get('PM_ADMIN_TOKEN')
+
+def is_admin(req):
+    """Whether a request carries the configured admin token"""
+    if not ADMIN_TOKEN:
+        return False
+    scheme, _, token = req.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Hot-swap the models: load the versions named by each group's versions/CURRENT
+    and switch every stream over without a restart. Which version is current is
+    only changed on disk (python -m utils.backtesting --promote), never by a request.
+    Requires "Authorization: Bearer <PM_ADMIN_TOKEN>"; without a configured token
+    the route is disabled. Under gunicorn only the worker that handles the request
+    reloads, so send it to each worker or restart them gracefully
+    """
+    global model_pool
+    if not is_admin(request):
+        return jsonify({'error': 'Model reload requires the admin token'}), 403
+    # A reload rebuilds every stream's engines, so concurrent requests are turned away rather than queued
+    if not model_reload_lock.acquire(blocking=False):
+        return jsonify({'error': 'A model reload is already running'}), 409
+    try:
+        start = time.perf_counter()
+        pool = load_model_pool()
+        for stream in assets.streams().values():
+            stream.swap_models(pool)
+        model_pool = pool
+    finally:
+        model_reload_lock.release()
+    return jsonify(dict(pool.registry.stats(), reload_seconds=time.perf_counter() - start))
+
+@app.route('/api/metrics')
+def metrics():
+    """Request, model, cache and tick metrics in the Prometheus text format"""
+    return app.response_class(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/metrics/profile', methods=['GET', 'POST'])
+def sampling_profile():
+    """
+    Sampling profiler, off by default.
+    POST {"enabled": true|false, "interval": seconds, "include_idle": bool, "reset": bool}
+    toggles it; GET returns its status and hottest functions (limit=<n>), or
+    flame-graph ready stacks with format=collapsed
+    """
+    if request.method == 'POST':
+        options = request.get_json(silent=True) or {}
+        try:
+            interval = float(options['interval']) if options.get('interval') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'interval must be a number of seconds'}), 400
+        if options.get('reset'):
+            profiler.reset()
+        if options.get('enabled') is True:
+            profiler.start(interval, options.get('include_idle'))
+        elif options.get('enabled') is False:
+            profiler.stop()
+        return jsonify(profiler.status())
+    if request.args.get('format') == 'collapsed':
+        return app.response_class(profiler.collapsed(), mimetype='text/plain')
+    return jsonify(dict(profiler.status(), top=profiler.top(request.args.get('limit', 20, type=int))))
+
+@app.route('/api/assets')
+def list_assets():
+    """Known assets and the state of the streams created so far"""
     return jsonify({
-        'active': pm_app.simulation_active,
-        'current_index': pm_app.current_index,
-        'total_rows': pm_app.total_rows,
-        'progress': (pm_app.current_index / pm_app.total_rows * 100) if pm_app.total_rows > 0 else 0
+        'default': assets.default,
+        'running': scheduler.running(),
+        'assets': assets.status()
     })
 
+@socketio.on('connect')
+def handle_connect():
+    """Send the current simulation state to a newly connected dashboard"""
+    emit('simulation_status', pm_app.simulation_status())
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join an asset's room to receive its ticks"""
+    asset_id = (data or {}).get('asset_id')
+    if asset_id not in assets:
+        emit('error', {'error': f"Unknown asset '{asset_id}'"})
+        return
+    if asset_id != DEFAULT_ASSET:
+        join_room(asset_id)
+    emit('simulation_status', assets.get(asset_id).simulation_status())
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    """Leave an asset's room"""
+    asset_id = (data or {}).get('asset_id')
+    if asset_id in assets and asset_id != DEFAULT_ASSET:
+        leave_room(asset_id)
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""
+Benchmarks for the DataProcessor pipeline and the Flask API.
+
+Each size builds a synthetic history with the Cleared_df0.csv schema, times
+the DataProcessor functions on it, then serves it as an extra asset stream
+and times every API route through the Flask test client. GET routes of the
+stream are timed twice: [cold] with its results cache emptied before every
+call, so the computation behind the route is measured, and [warm] repeating
+the same request, which measures cache hits and encoding. Run from the
+repository root:
+
+    python -m benchmarks.run --sizes 1k,10k,100k --output bench.json
+    python -m benchmarks.run --only 'route.*' --baseline bench.json
+
+Results are printed as a table and written as JSON. Limits in
+benchmarks/thresholds.json and slowdowns against a baseline run fail the
+run with exit status 1.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate, parse_size
+from utils.data_processing import DataProcessor
+from utils.data_store import SensorDataStore
+
+DEFAULT_SIZES = '1k,10k,100k'
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), 'thresholds.json')
+TICK_RESERVE = 100  # rows left unrevealed so stream.tick can be timed
+
+# (method, path under /api/assets/<asset_id>, query); {since} is the revealed row count minus 10
+ASSET_ROUTES = [
+    ('GET', '/current-data', ''),
+    ('GET', '/current-data', 'since={since}'),
+    ('GET', '/current-data', 'since={since}&format=float32'),
+    ('GET', '/current-data', 'max_points=500'),
+    ('GET', '/current-data', 'max_points=500&method=minmax'),
+    ('GET', '/predictions', ''),
+    ('GET', '/breakdown-prediction', ''),
+    ('GET', '/breakdown-prediction', 'start=0&end={since}'),
+    ('GET', '/kpis', ''),
+    ('GET', '/kpis', 'equipment=sp&window=24h'),
+    ('GET', '/health-score', ''),
+    ('GET', '/features', ''),
+    ('GET', '/control-charts', ''),
+    ('GET', '/anomalies', ''),
+    ('GET', '/simulation/status', ''),
+    ('POST', '/simulation/start', ''),
+    ('POST', '/simulation/stop', '')
+]
+GLOBAL_ROUTES = [
+    ('GET', '/api/models', ''),
+    ('GET', '/api/assets', ''),
+    ('GET', '/api/metrics', ''),
+    ('GET', '/api/metrics/profile', ''),
+    ('POST', '/api/models/reload', '')
+]
+
+
+def format_size(n_rows):
+    for suffix, unit in (('m', 1000000), ('k', 1000)):
+        if n_rows >= unit and n_rows % unit == 0:
+            return f'{n_rows // unit}{suffix}'
+    return str(n_rows)
+
+
+def measure(fn, rows=1, min_runs=5, max_runs=50, budget=2.0, setup=None):
+    """
+    Time fn() after one untimed warm-up call (reported as first_ms).
+    Runs at least min_runs and at most max_runs times, stopping early once
+    `budget` seconds have passed. `setup`, when given, runs untimed before every call.
+    """
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+
+    times = []
+    deadline = time.perf_counter() + budget
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() < deadline):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    times = np.array(times)
+    p50 = float(np.percentile(times, 50))
+    return {
+        'rows': rows,
+        'runs': len(times),
+        'first_ms': first * 1000,
+        'mean_ms': float(times.mean()) * 1000,
+        'min_ms': float(times.min()) * 1000,
+        'p50_ms': p50 * 1000,
+        'p99_ms': float(np.percentile(times, 99)) * 1000,
+        'calls_per_s': 1 / p50 if p50 > 0 else None,
+        'rows_per_s': rows / p50 if p50 > 0 else None
+    }
+
+
+class BenchmarkRunner:
+    def __init__(self, only=None, min_runs=5, max_runs=50, budget=2.0):
+        """Runs benchmarks whose names match one of the `only` patterns (all when empty)"""
+        self.only = only or []
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.budget = budget
+        self.results = []
+
+    def selected(self, name):
+        return not self.only or any(fnmatch.fnmatch(name, pattern) for pattern in self.only)
+
+    def run(self, name, size, fn, rows=1, runs=None, setup=None):
+        if not self.selected(name):
+            return None
+        min_runs, max_runs = (runs, runs) if runs is not None else (self.min_runs, self.max_runs)
+        key = f'{name}@{format_size(size)}'
+        try:
+            result = dict({'name': name, 'size': size, 'key': key},
+                          **measure(fn, rows, min_runs, max_runs, self.budget, setup))
+        except Exception as e:
+            result = {'name': name, 'size': size, 'key': key, 'error': str(e)}
+            print(f"{key:<60} ERROR {e}")
+        else:
+            rate = f"{result['rows_per_s']:14,.0f} rows/s" if rows > 1 else f"{result['calls_per_s']:14,.0f} calls/s"
+            print(f"{key:<60} p50 {result['p50_ms']:10.3f} ms   p99 {result['p99_ms']:10.3f} ms   {rate}")
+        self.results.append(result)
+        return result
+
+
+def benchmark_processor(runner, df, models, size):
+    """DataProcessor functions on a whole synthetic history"""
+    processor = DataProcessor()
+    features = df[processor.feature_columns]
+    rows = len(df)
+
+    runner.run('processor.calculate_statistical_features', size,
+               lambda: processor.calculate_statistical_features(df), rows)
+    runner.run('processor.detect_anomalies', size, lambda: processor.detect_anomalies(df), rows)
+    runner.run('processor.calculate_equipment_health_score', size,
+               lambda: processor.calculate_equipment_health_score(df), rows)
+    if 'scaler' in models['forecast']:
+        runner.run('processor.XGBoost_forecast', size, lambda: DataProcessor.XGBoost_forecast(
+            features, models['forecast'], processor.feature_columns, models['forecast']['scaler']), rows)
+
+
+def check_response(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f'HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return response
+
+
+def benchmark_stream(runner, web, df, size):
+    """An asset stream over the synthetic history: start-up, KPIs, ticks and every route"""
+    processor = DataProcessor()
+    columns = processor.feature_columns + processor.fault_columns
+    interval = timedelta(hours=2)
+    store = SensorDataStore.from_dataframe(df, columns, datetime.now() - interval * len(df), interval)
+    start_index = max(len(df) - TICK_RESERVE, len(df) // 2)
+    asset_id = f'bench-{format_size(size)}'
+
+    def create():
+        return web.PredictiveMaintenanceApp(asset_id, web.model_pool, store, web.scheduler, start_index)
+
+    stream = create()
+    runner.run('stream.init', size, create, start_index, runs=1)
+    runner.run('stream.calculate_kpis', size, lambda: stream.calculate_kpis('all'), stream.current_index)
+
+    def tick():
+        if stream.store.cursor < stream.total_rows:
+            stream.store.advance()
+            stream.sync()
+
+    # Each tick reveals a row, so the run count is bounded by the rows held back
+    runner.run('stream.tick', size, tick, runs=max(min(stream.total_rows - stream.current_index - 1,
+                                                        runner.max_runs), 1))
+
+    web.assets.add(asset_id, stream)
+    try:
+        client = web.app.test_client()
+        since = max(stream.current_index - 10, 0)
+        for method, path, query in ASSET_ROUTES:
+            url = f'/api/assets/{asset_id}{path}' + (f'?{query.format(since=since)}' if query else '')
+            name = f'route.{method} {path}' + (f'?{query}' if query else '')
+            if method == 'POST':
+                runner.run(name, size, lambda url=url: check_response(client.post(url)))
+                continue
+            # Cold calls find the results cache empty, so they time the computation itself;
+            # warm calls repeat the same request and time cache hits and encoding
+            runner.run(f'{name} [cold]', size, lambda url=url: check_response(client.get(url)),
+                       setup=lambda: stream.results.clear())
+            runner.run(f'{name} [warm]', size, lambda url=url: check_response(client.get(url)))
+        stream.stop_simulation()
+        for method, path, query in GLOBAL_ROUTES:
+            call = client.post if method == 'POST' else client.get
+            headers = {'Authorization': f'Bearer {web.ADMIN_TOKEN}'} if method == 'POST' else {}
+            runner.run(f'route.{method} {path}', size,
+                       lambda call=call, path=path, headers=headers: check_response(call(path, headers=headers)))
+    finally:
+        web.assets.remove(asset_id)
+
+
+def uncovered_routes(web):
+    """API rules that no benchmark exercises"""
+    asset_paths = {path for _, path, _ in ASSET_ROUTES}
+    global_paths = {path for _, path, _ in GLOBAL_ROUTES}
+    prefix = '/api/assets/<asset_id>'
+    missing = set()
+    for rule in web.app.url_map.iter_rules():
+        path = rule.rule
+        if path.startswith(prefix):
+            covered = path[len(prefix):] in asset_paths
+        elif path.startswith('/api/'):
+            # Default-asset routes mirror the per-asset ones
+            covered = path in global_paths or path[len('/api'):] in asset_paths
+        else:
+            continue
+        if not covered:
+            missing.add(path)
+    return sorted(missing)
+
+
+def check(results, thresholds=None, baseline=None, max_slowdown=None, min_delta_ms=None):
+    """
+    Failures against absolute limits ({key: {metric: max}}) and against a
+    baseline run, where a p50 more than max_slowdown times the baseline (and
+    at least min_delta_ms slower) counts as a regression.
+    """
+    thresholds = thresholds or {}
+    max_slowdown = max_slowdown if max_slowdown is not None else thresholds.get('max_slowdown', 1.5)
+    min_delta_ms = min_delta_ms if min_delta_ms is not None else thresholds.get('min_delta_ms', 1.0)
+    by_key = {result['key']: result for result in results}
+    failures = []
+
+    for result in results:
+        if 'error' in result:
+            failures.append({'key': result['key'], 'reason': f"error: {result['error']}"})
+
+    for key, limits in thresholds.get('limits', {}).items():
+        result = by_key.get(key)
+        if result is None or 'error' in result:
+            continue
+        for metric, limit in limits.items():
+            if result.get(metric) is not None and result[metric] > limit:
+                failures.append({'key': key, 'reason': f'{metric} {result[metric]:.3f} > limit {limit}'})
+
+    if baseline:
+        previous = {result['key']: result for result in baseline.get('results', []) if 'error' not in result}
+        for key, result in by_key.items():
+            before = previous.get(key)
+            if before is None or 'error' in result:
+                continue
+            ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] > 0 else 1.0
+            if ratio > max_slowdown and result['p50_ms'] - before['p50_ms'] > min_delta_ms:
+                failures.append({'key': key, 'reason': f"p50 {result['p50_ms']:.3f} ms is {ratio:.2f}x "
+                                                       f"baseline {before['p50_ms']:.3f} ms"})
+    return failures
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__
+    }
+
+
+def load_json(path):
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='row counts, e.g. 1k,100k,10m')
+    parser.add_argument('--only', action='append', help='glob over benchmark names, e.g. "route.*"')
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=50)
+    parser.add_argument('--budget', type=float, default=2.0, help='seconds per benchmark once min-runs is met')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help='limits file, "" to skip')
+    parser.add_argument('--baseline', help='earlier --output file to compare against')
+    parser.add_argument('--max-slowdown', type=float)
+    parser.add_argument('--min-delta-ms', type=float)
+    args = parser.parse_args(argv)
+
+    # Importing the app loads the models and the default stream; the token lets the reload route be timed
+    os.environ.setdefault('PM_ADMIN_TOKEN', 'benchmark')
+    import app as web
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    runner = BenchmarkRunner(args.only, args.min_runs, args.max_runs, args.budget)
+    for size in sizes:
+        df = generate(size, seed=args.seed)
+        benchmark_processor(runner, df, web.model_pool.models, size)
+        benchmark_stream(runner, web, df, size)
+        del df
+
+    missing = uncovered_routes(web)
+    if missing:
+        print(f"Routes without a benchmark: {', '.join(missing)}")
+
+    thresholds = load_json(args.thresholds) if args.thresholds and os.path.exists(args.thresholds) else None
+    failures = check(runner.results, thresholds, load_json(args.baseline), args.max_slowdown, args.min_delta_ms)
+    report = {'environment': environment(), 'sizes': sizes, 'results': runner.results,
+              'uncovered_routes': missing, 'failures': failures}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL {failure['key']}: {failure['reason']}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import os
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import DataProcessor
+
+REFERENCE_PATH = 'data/Cleared_df0.csv'
+SMOOTHING = 12  # rows of white noise averaged into each sample
+
+
+def column_order():
+    processor = DataProcessor()
+    return processor.feature_columns + processor.fault_columns
+
+
+def profile(path=REFERENCE_PATH):
+    """
+    Per-column statistics of the reference history: mean, std and range of
+    the sensors, and how often each fault flag is set.
+    """
+    processor = DataProcessor()
+    if os.path.exists(path):
+        df = pd.read_csv(path)
+    else:
+        df = pd.DataFrame(columns=column_order())
+    stats = {}
+    for col in processor.feature_columns:
+        values = df[col].dropna().values.astype(float) if col in df.columns else np.array([])
+        if len(values) > 1:
+            stats[col] = {'mean': values.mean(), 'std': values.std(ddof=1),
+                          'min': values.min(), 'max': values.max()}
+        else:
+            stats[col] = {'mean': 0.0, 'std': 1.0, 'min': -np.inf, 'max': np.inf}
+    for col in processor.fault_columns:
+        rate = float(df[col].mean()) if col in df.columns and len(df) else 0.3
+        stats[col] = {'rate': min(max(rate, 0.01), 0.99)}
+    return stats
+
+
+def generate_chunks(n_rows, chunk_rows=1000000, seed=0, stats=None):
+    """
+    Yield DataFrames with the Cleared_df0.csv schema, n_rows in total.
+
+    Sensors are smoothed Gaussian noise around the reference mean and std,
+    clipped to the reference range; fault flags are smoothed noise above the
+    quantile matching the reference fault rate, so they come in runs. Noise
+    carries over between chunks, so the series are continuous.
+    """
+    stats = profile() if stats is None else stats
+    columns = column_order()
+    rng = np.random.default_rng(seed)
+    carry = rng.standard_normal((SMOOTHING - 1, len(columns)))
+    scale = np.sqrt(SMOOTHING)
+    means = np.array([stats[col].get('mean', 0.0) for col in columns])
+    stds = np.array([stats[col].get('std', 1.0) for col in columns])
+    lows = np.array([stats[col].get('min', -np.inf) for col in columns])
+    highs = np.array([stats[col].get('max', np.inf) for col in columns])
+    faults = np.array(['rate' in stats[col] for col in columns])
+    cutoffs = np.array([NormalDist().inv_cdf(1 - stats[col]['rate']) if 'rate' in stats[col] else 0.0
+                        for col in columns])
+
+    produced = 0
+    while produced < n_rows:
+        size = min(chunk_rows, n_rows - produced)
+        noise = np.concatenate([carry, rng.standard_normal((size, len(columns)))])
+        prefix = np.concatenate([np.zeros((1, len(columns))), np.cumsum(noise, axis=0)])
+        smooth = (prefix[SMOOTHING:] - prefix[:-SMOOTHING]) / scale
+        carry = noise[len(noise) - (SMOOTHING - 1):]
+
+        values = np.clip(means + stds * smooth, lows, highs)
+        values[:, faults] = (smooth[:, faults] > cutoffs[faults]).astype(float)
+        yield pd.DataFrame(values, columns=columns)
+        produced += size
+
+
+def generate(n_rows, seed=0, stats=None):
+    """Synthetic sensor history of n_rows as one DataFrame"""
+    chunks = list(generate_chunks(n_rows, seed=seed, stats=stats))
+    if not chunks:
+        return pd.DataFrame(columns=column_order())
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def write_csv(path, n_rows, seed=0, chunk_rows=1000000):
+    """Write a synthetic history to CSV chunk by chunk, for histories larger than memory"""
+    stats = profile()
+    for i, chunk in enumerate(generate_chunks(n_rows, chunk_rows, seed, stats)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+def parse_size(text):
+    """Row counts such as 1000, 10k or 10m"""
+    text = str(text).strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("usage: python -m benchmarks.synthetic <rows, e.g. 10m> <output.csv>")
+        sys.exit(2)
+    rows = parse_size(sys.argv[1])
+    write_csv(sys.argv[2], rows)
+    print(f"Wrote {rows} rows to {sys.argv[2]}")
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for serving the dashboard from several worker processes.
+
+The master loads the sensor history once and owns the simulation cursors
+in a small shared memory segment; workers attach to it (PM_SHARED_STATE),
+memory-map the history from the .npy cache it names and catch their
+engines up with the shared cursor. Run with:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Socket.IO long-polling needs sticky sessions across workers, so put the
+workers behind a proxy with session affinity or let clients use websockets.
+"""
+import os
+from datetime import timedelta
+
+from utils.assets import DEFAULT_ASSET, load_asset_ids
+from utils.data_processing import DataProcessor
+from utils.ingestion import load_dataset, data_source
+from utils.shared_state import SharedState, SharedStateOwner
+
+bind = os.environ.get('PM_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('PM_WORKERS', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('PM_THREADS', 4))
+
+# Rows revealed before the simulation starts, as in PredictiveMaintenanceApp
+START_INDEX = 250
+
+
+def on_starting(server):
+    """Load the history, share it with the workers and start advancing cursors in the master"""
+    data_processor = DataProcessor()
+    columns = data_processor.feature_columns + data_processor.fault_columns
+    path, cache_dir = data_source()
+    dataset = load_dataset(path, columns, timedelta(hours=2), cache_dir)
+    state = SharedState.create(dataset, [DEFAULT_ASSET] + load_asset_ids(), start_index=START_INDEX)
+    os.environ['PM_SHARED_STATE'] = state.name
+    server.pm_shared_state = state
+    server.pm_owner = SharedStateOwner(state)
+    server.pm_owner.start()
+    server.log.info(f"Shared state {state.name}: {dataset.total_rows} rows, {len(state.asset_ids)} assets")
+
+
+def on_exit(server):
+    """Stop the cursor owner and free the shared segment"""
+    server.pm_owner.stop()
+    server.pm_shared_state.unlink()
@@ -148,10 +148,15 @@ class PredictiveMaintenanceDashboard {
         this.isSimulationRunning = false;
         this.currentDataIndex = 100; // Start with first 100 rows
         this.maxDataIndex = 0; // Will be set from server
+        this.socket = null;
+        this.currentData = null;
+        this.latestPredictions = null;
+        this.latestKpis = null;
         
         this.initializeCharts();
         this.setupEventListeners();
         this.loadInitialData();
+        this.connectSocket();
     }
 
     initializeCharts() {
@@ -415,13 +420,13 @@ class PredictiveMaintenanceDashboard {
 
         if (paramSelect) {
             paramSelect.addEventListener('change', (e) => {
-                this.updateTrendChart(e.target.value);
+                this.renderTrendChart(e.target.value);
             });
         }
 
         if (controlParamSelect) {
             controlParamSelect.addEventListener('change', (e) => {
-                this.updateControlChart(e.target.value);
+                this.renderControlChart(e.target.value);
             });
         }
 
@@ -429,7 +434,7 @@ class PredictiveMaintenanceDashboard {
         const equipmentSelect = document.getElementById('kpiEquipmentSelect');
         if (equipmentSelect) {
             equipmentSelect.addEventListener('change', () => {
-                this.updateKPIs();
+                this.renderKPIs();
             });
         }
     }
@@ -452,8 +457,10 @@ class PredictiveMaintenanceDashboard {
             this.updateSimulationStatus();
             this.showNotification('Simulation started successfully', 'success');
             
-            // Start auto-refresh when simulation is running
-            this.startDataRefresh();
+            // Fall back to polling only when the push channel is unavailable
+            if (!this.isSocketConnected()) {
+                this.startDataRefresh();
+            }
         } catch (error) {
             console.error('Error starting simulation:', error);
             this.showNotification('Error starting simulation', 'error');
@@ -488,6 +495,63 @@ class PredictiveMaintenanceDashboard {
         }
     }
 
+    connectSocket() {
+        // Socket.IO client is loaded from a CDN; keep polling if it is missing
+        if (typeof io === 'undefined') {
+            console.warn('Socket.IO client not available, falling back to polling');
+            return;
+        }
+
+        this.socket = io();
+
+        this.socket.on('connect', () => {
+            // Pushes replace polling while the socket is up
+            if (this.updateInterval) {
+                clearInterval(this.updateInterval);
+                this.updateInterval = null;
+            }
+        });
+
+        this.socket.on('disconnect', () => {
+            if (this.isSimulationRunning) {
+                this.startDataRefresh();
+            }
+        });
+
+        this.socket.on('simulation_status', (status) => {
+            this.renderSimulationStatus(status);
+        });
+
+        this.socket.on('tick', (message) => {
+            this.applyTick(message);
+        });
+    }
+
+    isSocketConnected() {
+        return Boolean(this.socket && this.socket.connected);
+    }
+
+    applyTick(message) {
+        // Append the newly revealed row to the local history
+        if (this.currentData && this.currentData.parameters) {
+            this.currentData.timestamps.push(message.timestamp);
+            Object.entries(message.row).forEach(([param, value]) => {
+                if (!this.currentData.parameters[param]) {
+                    this.currentData.parameters[param] = [];
+                }
+                this.currentData.parameters[param].push(value);
+            });
+        }
+
+        this.latestKpis = message.kpis;
+        this.latestPredictions = message.predictions;
+
+        this.renderSimulationStatus(message);
+        this.renderKPIs();
+        this.renderBreakdown(message.breakdown);
+        this.renderCharts();
+    }
+
     async updateSimulationStatus() {
         try {
             const response = await fetch('/api/simulation/status');
@@ -496,48 +560,36 @@ class PredictiveMaintenanceDashboard {
             }
             
             const status = await response.json();
-            
-            const statusElement = document.getElementById('simulationStatus');
-            const progressElement = document.getElementById('progressFill');
-            
-            if (statusElement) {
-                statusElement.textContent = status.active ? 'Running' : 'Stopped';
-                statusElement.className = status.active ? 'status-running' : 'status-stopped';
-            }
-            
-            if (progressElement) {
-                progressElement.style.width = `${status.progress || 0}%`;
-            }
-            
-            this.isSimulationRunning = status.active;
-            this.currentDataIndex = status.current_index || this.currentDataIndex;
-            this.maxDataIndex = status.max_index || this.maxDataIndex;
+            this.renderSimulationStatus(status);
             
         } catch (error) {
             console.error('Error updating simulation status:', error);
         }
     }
 
+    renderSimulationStatus(status) {
+        const statusElement = document.getElementById('simulationStatus');
+        const progressElement = document.getElementById('progressFill');
+        
+        if (statusElement) {
+            statusElement.textContent = status.active ? 'Running' : 'Stopped';
+            statusElement.className = status.active ? 'status-running' : 'status-stopped';
+        }
+        
+        if (progressElement) {
+            progressElement.style.width = `${status.progress || 0}%`;
+        }
+        
+        this.isSimulationRunning = status.active;
+        this.currentDataIndex = status.current_index || this.currentDataIndex;
+        this.maxDataIndex = status.max_index || this.maxDataIndex;
+    }
+
     async loadInitialData() {
         this.showLoading(true);
         
         try {
-            await Promise.all([
-                this.updateKPIs(),
-                this.updateCurrentData(),
-                this.updateBreakdownPrediction(),
-                this.updateEquipmentHealth(),
-                this.updateDataTable()
-            ]);
-
-            // Update charts with current parameter selection
-            const selectedParam = document.getElementById('parameterSelect')?.value || '310A_FI_4303';
-            const selectedControlParam = document.getElementById('controlParameterSelect')?.value || '310A_FI_4303';
-            
-            await Promise.all([
-                this.updateTrendChart(selectedParam),
-                this.updateControlChart(selectedControlParam)
-            ]);
+            await this.refreshAllData();
             
             // Update simulation status
             await this.updateSimulationStatus();
@@ -552,61 +604,72 @@ class PredictiveMaintenanceDashboard {
 
     async refreshAllData() {
         try {
+            // Fetch each resource once, then render every widget from local state
             await Promise.all([
                 this.updateKPIs(),
                 this.updateCurrentData(),
-                this.updateBreakdownPrediction(),
-                this.updateDataTable()
+                this.updatePredictions(),
+                this.updateBreakdownPrediction()
             ]);
 
-            // Update charts with current parameter selection
-            const selectedParam = document.getElementById('parameterSelect')?.value || '310A_FI_4303';
-            const selectedControlParam = document.getElementById('controlParameterSelect')?.value || '310A_FI_4303';
-            
-            await Promise.all([
-                this.updateTrendChart(selectedParam),
-                this.updateControlChart(selectedControlParam)
-            ]);
+            this.renderCharts();
             
         } catch (error) {
             console.error('Error refreshing data:', error);
         }
     }
 
+    renderCharts() {
+        const selectedParam = document.getElementById('parameterSelect')?.value || '310A_FI_4303';
+        const selectedControlParam = document.getElementById('controlParameterSelect')?.value || '310A_FI_4303';
+
+        this.updateMultiParameterChart();
+        this.renderTrendChart(selectedParam);
+        this.renderControlChart(selectedControlParam);
+        this.renderDataTable();
+    }
+
     async updateKPIs() {
         try {
-            // Get selected equipment from dropdown
-            const equipmentSelect = document.getElementById('kpiEquipmentSelect');
-            let equipment = 'all';
-            if (equipmentSelect) {
-                equipment = equipmentSelect.value;
-            }
-
-            // Fetch KPIs for selected equipment
-            const response = await fetch(`/api/kpis?equipment=${equipment}`);
+            // Fetch KPIs for every equipment; the selector is applied locally
+            const response = await fetch('/api/kpis?equipment=all');
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
-            const kpis = await response.json();
-
-            // Update KPI values
-            this.updateKPIElement('mtbfValue', kpis.MTBF, 'hours');
-            this.updateKPIElement('mttrValue', kpis.MTTR, 'hours');
-            this.updateKPIElement('availabilityValue', kpis.Availability, '%');
-            this.updateKPIElement('reliabilityValue', kpis.Reliability, '%');
-            this.updateKPIElement('totalFaultsValue', kpis.Total_Faults, '');
-            this.updateKPIElement('operatingHoursValue', kpis.Operating_Hours, 'hours');
-
-            // Add visual indicators based on values
-            this.updateKPIStatus('availabilityValue', parseFloat(kpis.Availability), [95, 85]);
-            this.updateKPIStatus('reliabilityValue', parseFloat(kpis.Reliability), [95, 85]);
+            this.latestKpis = await response.json();
+            this.renderKPIs();
             
         } catch (error) {
             console.error('Error updating KPIs:', error);
         }
     }
 
+    renderKPIs() {
+        if (!this.latestKpis) return;
+
+        // Get selected equipment from dropdown
+        const equipmentSelect = document.getElementById('kpiEquipmentSelect');
+        let equipment = 'all';
+        if (equipmentSelect) {
+            equipment = equipmentSelect.value;
+        }
+
+        const kpis = equipment === 'all' ? this.latestKpis : (this.latestKpis[equipment] || {});
+
+        // Update KPI values
+        this.updateKPIElement('mtbfValue', kpis.MTBF, 'hours');
+        this.updateKPIElement('mttrValue', kpis.MTTR, 'hours');
+        this.updateKPIElement('availabilityValue', kpis.Availability, '%');
+        this.updateKPIElement('reliabilityValue', kpis.Reliability, '%');
+        this.updateKPIElement('totalFaultsValue', kpis.Total_Faults, '');
+        this.updateKPIElement('operatingHoursValue', kpis.Operating_Hours, 'hours');
+
+        // Add visual indicators based on values
+        this.updateKPIStatus('availabilityValue', parseFloat(kpis.Availability), [95, 85]);
+        this.updateKPIStatus('reliabilityValue', parseFloat(kpis.Reliability), [95, 85]);
+    }
+
     updateKPIElement(elementId, value, unit) {
         const element = document.getElementById(elementId);
         if (element) {
@@ -639,21 +702,64 @@ class PredictiveMaintenanceDashboard {
 
     async updateCurrentData() {
         try {
-            const response = await fetch('/api/current-data');
+            // Once the history is loaded, only ask for the rows revealed since
+            const known = this.currentData?.timestamps?.length;
+            const url = known ? `/api/current-data?since=${known}` : '/api/current-data';
+            const response = await fetch(url);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
-            this.currentData = await response.json();
-            
-            // Update multi-parameter radar chart
-            this.updateMultiParameterChart();
+            const data = await response.json();
+            if (known) {
+                this.appendColumnarData(data);
+            } else {
+                this.currentData = data;
+            }
             
         } catch (error) {
             console.error('Error updating current data:', error);
         }
     }
 
+    appendColumnarData(delta) {
+        const rowCount = delta.end - delta.start;
+        if (rowCount <= 0) return;
+
+        const base = new Date(delta.base_timestamp.replace(' ', 'T'));
+        for (let i = 0; i < rowCount; i++) {
+            const timestamp = new Date(base.getTime() + i * delta.interval_seconds * 1000);
+            this.currentData.timestamps.push(this.formatTimestamp(timestamp));
+        }
+
+        delta.columns.forEach(param => {
+            if (!this.currentData.parameters[param]) {
+                this.currentData.parameters[param] = [];
+            }
+            this.currentData.parameters[param].push(...delta.parameters[param]);
+        });
+    }
+
+    formatTimestamp(date) {
+        const pad = (value) => String(value).padStart(2, '0');
+        return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())} ` +
+            `${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(date.getSeconds())}`;
+    }
+
+    async updatePredictions() {
+        try {
+            const response = await fetch('/api/predictions?steps=10');
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            this.latestPredictions = await response.json();
+
+        } catch (error) {
+            console.error('Error updating predictions:', error);
+        }
+    }
+
     async updateBreakdownPrediction() {
         try {
             const response = await fetch('/api/breakdown-prediction');
@@ -662,25 +768,28 @@ class PredictiveMaintenanceDashboard {
             }
             
             const predictions = await response.json();
-            console.log(predictions)
-            // Update breakdown chart
-            this.charts.breakdown.data.datasets[0].data = [
-                (predictions.faulty_SP || 0) * 100,
-                (predictions.faulty_TK || 0) * 100,
-                (predictions.faulty_VP || 0) * 100
-            ];
-            this.charts.breakdown.update();
-
-            // Update equipment health displays
-            this.updateEquipmentHealthDisplay('sp', predictions.faulty_SP || 0);
-            this.updateEquipmentHealthDisplay('tk', predictions.faulty_TK || 0);
-            this.updateEquipmentHealthDisplay('vp', predictions.faulty_VP || 0);
+            this.renderBreakdown(predictions);
             
         } catch (error) {
             console.error('Error updating breakdown prediction:', error);
         }
     }
 
+    renderBreakdown(predictions) {
+        // Update breakdown chart
+        this.charts.breakdown.data.datasets[0].data = [
+            (predictions.faulty_SP || 0) * 100,
+            (predictions.faulty_TK || 0) * 100,
+            (predictions.faulty_VP || 0) * 100
+        ];
+        this.charts.breakdown.update();
+
+        // Update equipment health displays
+        this.updateEquipmentHealthDisplay('sp', predictions.faulty_SP || 0);
+        this.updateEquipmentHealthDisplay('tk', predictions.faulty_TK || 0);
+        this.updateEquipmentHealthDisplay('vp', predictions.faulty_VP || 0);
+    }
+
     updateEquipmentHealthDisplay(equipment, faultProbability) {
         const healthPercent = Math.max(0, (1 - faultProbability) * 100);
         const riskPercent = faultProbability * 100;
@@ -724,28 +833,18 @@ class PredictiveMaintenanceDashboard {
         return 'risk-high';
     }
 
-   async updateTrendChart(parameter = '310A_FI_4303') {
-    try {
-        const [currentResponse, predictionsResponse] = await Promise.all([
-            fetch('/api/current-data'),
-            fetch(`/api/predictions?parameter=${parameter}&steps=10`)
-        ]);
+    renderTrendChart(parameter = '310A_FI_4303') {
+        const currentData = this.currentData;
+        const predictions = this.latestPredictions || { predictions: [], timestamps: [] };
 
-        if (!currentResponse.ok || !predictionsResponse.ok) {
-            throw new Error('Failed to fetch trend data');
-        }
-
-        const currentData = await currentResponse.json();
-        const predictions = await predictionsResponse.json();
-
-        if (!currentData.parameters || !currentData.parameters[parameter]) {
+        if (!currentData || !currentData.parameters || !currentData.parameters[parameter]) {
             console.warn(`Parameter ${parameter} not found in current data`);
             return;
         }
 
         const historicalData = currentData.parameters[parameter];
         const historicalTimestamps = currentData.timestamps;
-        const predictedData = Object.fromEntries(predictions.predictions)[parameter] || [];
+        const predictedData = Object.fromEntries(predictions.predictions || [])[parameter] || [];
         const predictedTimestamps = predictions.timestamps || [];
 
         const maxPoints = 50;
@@ -784,67 +883,51 @@ class PredictiveMaintenanceDashboard {
 
         this.charts.trend.options.plugins.title.text = `${parameter} - Trend Analysis`;
         this.charts.trend.update();
-
-    } catch (error) {
-        console.error('Error updating trend chart:', error);
     }
-}
 
+    renderControlChart(parameter = '310A_FI_4303') {
+        const currentData = this.currentData;
+
+        if (!currentData || !currentData.parameters || !currentData.parameters[parameter]) {
+            console.warn(`Parameter ${parameter} not found in current data`);
+            return;
+        }
+
+        const data = currentData.parameters[parameter];
+        const timestamps = currentData.timestamps;
 
+        // Show last 30 points for better visibility
+        const maxPoints = 30;
+        const startIndex = Math.max(0, data.length - maxPoints);
+        const limitedData = data.slice(startIndex);
+        const limitedTimestamps = timestamps.slice(startIndex);
 
-    async updateControlChart(parameter = '310A_FI_4303') {
-        try {
-            const response = await fetch('/api/current-data');
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const currentData = await response.json();
+        // Calculate control limits using all available data for statistical accuracy
+        const mean = data.reduce((a, b) => a + b, 0) / data.length;
+        const variance = data.reduce((a, b) => a + Math.pow(b - mean, 2), 0) / data.length;
+        const stdDev = Math.sqrt(variance);
 
-            if (!currentData.parameters || !currentData.parameters[parameter]) {
-                console.warn(`Parameter ${parameter} not found in current data`);
-                return;
-            }
+        const ucl = mean + 3 * stdDev;
+        const lcl = mean - 3 * stdDev;
 
-            const data = currentData.parameters[parameter];
-            const timestamps = currentData.timestamps;
-
-            // Show last 30 points for better visibility
-            const maxPoints = 30;
-            const startIndex = Math.max(0, data.length - maxPoints);
-            const limitedData = data.slice(startIndex);
-            const limitedTimestamps = timestamps.slice(startIndex);
-
-            // Calculate control limits using all available data for statistical accuracy
-            const mean = data.reduce((a, b) => a + b, 0) / data.length;
-            const variance = data.reduce((a, b) => a + Math.pow(b - mean, 2), 0) / data.length;
-            const stdDev = Math.sqrt(variance);
-
-            const ucl = mean + 3 * stdDev;
-            const lcl = mean - 3 * stdDev;
-
-            // Update chart
-            this.charts.control.data.labels = limitedTimestamps.map((timestamp, index) => `${startIndex + index + 1}`);
-            this.charts.control.data.datasets[0].data = limitedData;
-            this.charts.control.data.datasets[1].data = Array(limitedData.length).fill(mean);
-            this.charts.control.data.datasets[2].data = Array(limitedData.length).fill(ucl);
-            this.charts.control.data.datasets[3].data = Array(limitedData.length).fill(lcl);
-
-            // Highlight out-of-control points
-            const pointColors = limitedData.map(value => {
-                if (value > ucl || value < lcl) {
-                    return '#f44336'; // Red for out-of-control
-                }
-                return '#2196F3'; // Blue for in-control
-            });
-            this.charts.control.data.datasets[0].pointBackgroundColor = pointColors;
+        // Update chart
+        this.charts.control.data.labels = limitedTimestamps.map((timestamp, index) => `${startIndex + index + 1}`);
+        this.charts.control.data.datasets[0].data = limitedData;
+        this.charts.control.data.datasets[1].data = Array(limitedData.length).fill(mean);
+        this.charts.control.data.datasets[2].data = Array(limitedData.length).fill(ucl);
+        this.charts.control.data.datasets[3].data = Array(limitedData.length).fill(lcl);
+
+        // Highlight out-of-control points
+        const pointColors = limitedData.map(value => {
+            if (value > ucl || value < lcl) {
+                return '#f44336'; // Red for out-of-control
+            }
+            return '#2196F3'; // Blue for in-control
+        });
+        this.charts.control.data.datasets[0].pointBackgroundColor = pointColors;
 
-            this.charts.control.options.plugins.title.text = `${parameter} - Control Chart`;
-            this.charts.control.update();
-            
-        } catch (error) {
-            console.error('Error updating control chart:', error);
-        }
+        this.charts.control.options.plugins.title.text = `${parameter} - Control Chart`;
+        this.charts.control.update();
     }
 
     updateMultiParameterChart() {
@@ -872,58 +955,49 @@ class PredictiveMaintenanceDashboard {
         this.charts.multiParameter.update();
     }
 
-    async updateDataTable() {
-        try {
-            const response = await fetch('/api/current-data');
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const data = await response.json();
+    renderDataTable() {
+        const data = this.currentData;
 
-            if (!data.parameters || !data.timestamps) return;
+        if (!data || !data.parameters || !data.timestamps) return;
 
-            const tableBody = document.getElementById('dataTableBody');
-            if (!tableBody) return;
-            
-            tableBody.innerHTML = '';
+        const tableBody = document.getElementById('dataTableBody');
+        if (!tableBody) return;
 
-            // Show last 15 records
-            const recordCount = Math.min(15, data.timestamps.length);
-            const startIndex = data.timestamps.length - recordCount;
+        tableBody.innerHTML = '';
 
-            for (let i = startIndex; i < data.timestamps.length; i++) {
-                const row = document.createElement('tr');
-                
-                const timestamp = data.timestamps[i];
-                const fi4303 = data.parameters['310A_FI_4303']?.[i];
-                const di3302 = data.parameters['310A_DI_3302']?.[i];
-                const pi0316 = data.parameters['310A_PI_0316']?.[i];
-                const ti5303 = data.parameters['310A_TI_5303_D']?.[i];
-                const ti5304 = data.parameters['310A_TI_5304_D']?.[i];
-                const spFault = data.parameters['faulty_SP']?.[i] || 0;
-                const tkFault = data.parameters['faulty_TK']?.[i] || 0;
-                const vpFault = data.parameters['faulty_VP']?.[i] || 0;
-
-                // Format timestamp
-                const formattedTime = new Date(timestamp).toLocaleString();
-
-                row.innerHTML = `
-                    <td>${formattedTime}</td>
-                    <td>${fi4303 !== undefined ? fi4303.toFixed(2) : 'N/A'}</td>
-                    <td>${di3302 !== undefined ? di3302.toFixed(3) : 'N/A'}</td>
-                    <td>${pi0316 !== undefined ? pi0316.toFixed(2) : 'N/A'}</td>
-                    <td>${ti5303 !== undefined ? ti5303.toFixed(0) : 'N/A'}</td>
-                    <td>${ti5304 !== undefined ? ti5304.toFixed(0) : 'N/A'}</td>
-                    <td><span class="status-indicator ${spFault ? 'status-error' : 'status-ok'}"></span>${spFault ? 'FAULT' : 'OK'}</td>
-                    <td><span class="status-indicator ${tkFault ? 'status-error' : 'status-ok'}"></span>${tkFault ? 'FAULT' : 'OK'}</td>
-                    <td><span class="status-indicator ${vpFault ? 'status-error' : 'status-ok'}"></span>${vpFault ? 'FAULT' : 'OK'}</td>
-                `;
-
-                tableBody.appendChild(row);
-            }
-        } catch (error) {
-            console.error('Error updating data table:', error);
+        // Show last 15 records
+        const recordCount = Math.min(15, data.timestamps.length);
+        const startIndex = data.timestamps.length - recordCount;
+
+        for (let i = startIndex; i < data.timestamps.length; i++) {
+            const row = document.createElement('tr');
+
+            const timestamp = data.timestamps[i];
+            const fi4303 = data.parameters['310A_FI_4303']?.[i];
+            const di3302 = data.parameters['310A_DI_3302']?.[i];
+            const pi0316 = data.parameters['310A_PI_0316']?.[i];
+            const ti5303 = data.parameters['310A_TI_5303_D']?.[i];
+            const ti5304 = data.parameters['310A_TI_5304_D']?.[i];
+            const spFault = data.parameters['faulty_SP']?.[i] || 0;
+            const tkFault = data.parameters['faulty_TK']?.[i] || 0;
+            const vpFault = data.parameters['faulty_VP']?.[i] || 0;
+
+            // Format timestamp
+            const formattedTime = new Date(timestamp).toLocaleString();
+
+            row.innerHTML = `
+                <td>${formattedTime}</td>
+                <td>${fi4303 !== undefined ? fi4303.toFixed(2) : 'N/A'}</td>
+                <td>${di3302 !== undefined ? di3302.toFixed(3) : 'N/A'}</td>
+                <td>${pi0316 !== undefined ? pi0316.toFixed(2) : 'N/A'}</td>
+                <td>${ti5303 !== undefined ? ti5303.toFixed(0) : 'N/A'}</td>
+                <td>${ti5304 !== undefined ? ti5304.toFixed(0) : 'N/A'}</td>
+                <td><span class="status-indicator ${spFault ? 'status-error' : 'status-ok'}"></span>${spFault ? 'FAULT' : 'OK'}</td>
+                <td><span class="status-indicator ${tkFault ? 'status-error' : 'status-ok'}"></span>${tkFault ? 'FAULT' : 'OK'}</td>
+                <td><span class="status-indicator ${vpFault ? 'status-error' : 'status-ok'}"></span>${vpFault ? 'FAULT' : 'OK'}</td>
+            `;
+
+            tableBody.appendChild(row);
         }
     }
 
@@ -1038,6 +1112,10 @@ class PredictiveMaintenanceDashboard {
         if (this.updateInterval) {
             clearInterval(this.updateInterval);
         }
+
+        if (this.socket) {
+            this.socket.disconnect();
+        }
         
         // Destroy all charts
         Object.values(this.charts).forEach(chart => {
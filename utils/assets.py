@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import TICK_LAG, TICK_DURATION
+
+
+# Asset served by the routes without an /api/assets/<asset_id> prefix
+DEFAULT_ASSET = '310A'
+
+
+def load_asset_ids(path='data/Tag_Name.json'):
+    """Equipment tags listed in the tag file"""
+    try:
+        with open(path) as f:
+            return list(json.load(f).get('tags', []))
+    except Exception as e:
+        print(f"Error loading asset list: {e}")
+        return []
+
+
+class AssetRegistry:
+    def __init__(self, factory, asset_ids, default=None):
+        """
+        Per-asset streams, created on first use by `factory(asset_id)`.
+
+        Only assets that are actually requested hold any state, so listing
+        hundreds of assets costs nothing until they are monitored.
+        """
+        self.factory = factory
+        self.default = default if default is not None else (asset_ids[0] if asset_ids else None)
+        self.ids = list(dict.fromkeys(([self.default] if self.default is not None else []) + list(asset_ids)))
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, asset_id):
+        return asset_id in self.ids
+
+    def get(self, asset_id=None):
+        """Stream for an asset, the default asset when none is given"""
+        asset_id = self.default if asset_id is None else asset_id
+        if asset_id not in self.ids:
+            raise KeyError(f"Unknown asset '{asset_id}'")
+        stream = self._streams.get(asset_id)
+        if stream is None:
+            with self._lock:
+                stream = self._streams.get(asset_id)
+                if stream is None:
+                    stream = self.factory(asset_id)
+                    self._streams[asset_id] = stream
+        return stream
+
+    def add(self, asset_id, stream):
+        """Register an already built stream"""
+        with self._lock:
+            if asset_id not in self.ids:
+                self.ids.append(asset_id)
+            self._streams[asset_id] = stream
+
+    def remove(self, asset_id):
+        """Forget an asset and its stream"""
+        with self._lock:
+            if asset_id in self.ids and asset_id != self.default:
+                self.ids.remove(asset_id)
+            return self._streams.pop(asset_id, None)
+
+    def streams(self):
+        """Streams created so far"""
+        with self._lock:
+            return dict(self._streams)
+
+    def status(self):
+        streams = self.streams()
+        return [
+            dict({'asset_id': asset_id, 'loaded': asset_id in streams},
+                 **(streams[asset_id].simulation_status() if asset_id in streams else {}))
+            for asset_id in self.ids
+        ]
+
+
+class StreamScheduler:
+    def __init__(self, max_workers=4):
+        """
+        One timer thread advancing every running stream.
+
+        Due ticks are kept in a heap keyed by time and run on a shared thread
+        pool. A stream is only rescheduled once its tick has finished, so its
+        ticks never overlap. Streams need a tick() method returning whether
+        to keep running, and a simulation_interval in seconds.
+        """
+        self.max_workers = max_workers
+        self._heap = []
+        self._tokens = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._pool = None
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stream')
+            self._thread = threading.Thread(target=self._run, name='stream-scheduler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def schedule(self, stream, delay=None):
+        """Start ticking a stream every simulation_interval seconds"""
+        delay = stream.simulation_interval if delay is None else delay
+        with self._condition:
+            token = next(self._counter)
+            self._tokens[id(stream)] = token
+            heapq.heappush(self._heap, (time.monotonic() + delay, token, stream))
+            self._start()
+            self._condition.notify()
+
+    def cancel(self, stream):
+        """Stop ticking a stream; a tick already running still completes"""
+        with self._condition:
+            self._tokens.pop(id(stream), None)
+
+    def running(self):
+        with self._condition:
+            return len(self._tokens)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                due, token, stream = self._heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                if self._tokens.get(id(stream)) != token:
+                    continue
+            try:
+                self._pool.submit(self._tick, stream, token, due)
+            except RuntimeError:
+                # The pool is shut down when the interpreter exits
+                return
+
+    def _tick(self, stream, token, due):
+        asset = getattr(stream, 'asset_id', '')
+        started = time.monotonic()
+        TICK_LAG.observe(max(started - due, 0.0), asset=asset)
+        try:
+            keep_running = stream.tick()
+        except Exception as e:
+            print(f"Error advancing stream: {e}")
+            keep_running = True
+        TICK_DURATION.observe(time.monotonic() - started, asset=asset)
+        with self._condition:
+            if self._tokens.get(id(stream)) != token:
+                return
+            if not keep_running:
+                self._tokens.pop(id(stream), None)
+                return
+            next_due = max(due + stream.simulation_interval, time.monotonic())
+            heapq.heappush(self._heap, (next_due, token, stream))
+            self._condition.notify()
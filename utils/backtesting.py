@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+
+from utils.forecasting import build_lag_matrix
+from utils.model_registry import (MODEL_GROUPS, VERSIONS_DIR, MANIFEST_FILE, ModelRegistry,
+                                  current_version, read_manifest, set_current_version)
+
+# Rows of the lagged design matrix and the scaled targets, set once per worker process
+_worker_data = {}
+
+
+def walk_forward_splits(n_samples, n_folds=5, min_train=None):
+    """
+    Expanding-window folds as (train_end, test_end) pairs: each fold trains
+    on samples [0, train_end) and is scored on [train_end, test_end), so a
+    model is only ever tested on data newer than anything it was fitted on.
+    """
+    min_train = max(n_samples // (n_folds + 1), 1) if min_train is None else min_train
+    test_size = (n_samples - min_train) // n_folds if n_folds > 0 else 0
+    if test_size <= 0:
+        return []
+    return [(n_samples - (n_folds - i) * test_size, n_samples - (n_folds - i - 1) * test_size)
+            for i in range(n_folds)]
+
+
+def errors(actual, predicted):
+    """MAE, RMSE and mean absolute percentage error (over non-zero actuals)"""
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    if len(actual) == 0:
+        return {'mae': None, 'rmse': None, 'mape': None, 'n': 0}
+    diff = predicted - actual
+    nonzero = actual != 0
+    return {
+        'mae': float(np.mean(np.abs(diff))),
+        'rmse': float(np.sqrt(np.mean(diff ** 2))),
+        'mape': float(np.mean(np.abs(diff[nonzero] / actual[nonzero]))) if nonzero.any() else None,
+        'n': int(len(actual))
+    }
+
+
+def _single_threaded(estimator):
+    """Unfitted copy of an estimator with its own threading turned off, as processes already run in parallel"""
+    candidate = clone(estimator)
+    if 'n_jobs' in candidate.get_params():
+        candidate.set_params(n_jobs=1)
+    return candidate
+
+
+def _init_worker(X, Y):
+    _worker_data['X'] = X
+    _worker_data['Y'] = Y
+
+
+def _concatenate(parts):
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _evaluate_target(task):
+    """
+    Walk-forward predictions of one target for a candidate refitted on each
+    fold, plus the candidate refitted on all rows. With a `cutoff` (the
+    first sample the current model was not trained on) the current model
+    also predicts the held-out rows from the cutoff on.
+    """
+    target, column, estimator, folds, cutoff, retrain = task
+    X, y = _worker_data['X'], _worker_data['Y'][:, column]
+    candidate, current = [], []
+    start = time.perf_counter()
+    for train_end, test_end in folds:
+        model = _single_threaded(estimator)
+        model.fit(X[:train_end], y[:train_end])
+        candidate.append(model.predict(X[train_end:test_end]))
+        if cutoff is not None:
+            first = min(max(train_end, cutoff), test_end)
+            current.append(estimator.predict(X[first:test_end]) if first < test_end else np.empty(0))
+    final = None
+    if retrain:
+        final = _single_threaded(estimator)
+        final.fit(X, y)
+    return target, candidate, current, final, time.perf_counter() - start
+
+
+class WalkForwardBacktest:
+    def __init__(self, models, scaler, target_columns, lag=10, n_folds=5, min_train=None, max_workers=None):
+        """
+        Walk-forward evaluation and retraining of the per-tag forecast models.
+
+        The lagged design matrix is built once from sliding views (see
+        build_lag_matrix) and handed to each worker process when it starts,
+        so targets only send their estimator and fold bounds. Every target's
+        model is cloned from its current hyperparameters and refitted per fold.
+
+        The current models must only be scored on rows they were not fitted
+        on. When the number of history rows they were trained on is known
+        (`trained_rows` in run), they are compared with the candidates on
+        the held-out rows after that cutoff. Otherwise, e.g. for the bundled
+        models, there are no such rows, so the current hyperparameters
+        refitted per fold stand in for them. That is the candidate itself,
+        so such a backtest can only show that retraining is no worse.
+        """
+        self.models = models
+        self.scaler = scaler
+        self.target_columns = list(target_columns)
+        self.lag = lag
+        self.n_folds = n_folds
+        self.min_train = min_train
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def design(self, values):
+        """Lagged features and scaled targets for a raw (n_rows, n_targets) history"""
+        scaled = self.scaler.transform(np.asarray(values, dtype=float))
+        X = build_lag_matrix(scaled, self.lag)
+        return np.ascontiguousarray(X), np.ascontiguousarray(scaled[self.lag:])
+
+    def _unscale(self, column, values):
+        if len(values) == 0:
+            return values
+        dummy = np.zeros((len(values), len(self.target_columns)))
+        dummy[:, column] = values
+        return self.scaler.inverse_transform(dummy)[:, column]
+
+    def run(self, values, retrain=False, trained_rows=None):
+        """
+        Backtest every target (and refit them on all rows when `retrain`).
+        `trained_rows` is how many leading rows of `values` the current
+        models were fitted on, when known. Returns (report, retrained models by target).
+        """
+        start = time.perf_counter()
+        X, Y = self.design(values)
+        folds = walk_forward_splits(len(X), self.n_folds, self.min_train)
+        # Sample k predicts row k + lag, so a model fitted on the first n rows has seen samples before n - lag
+        cutoff = None if trained_rows is None else max(int(trained_rows) - self.lag, 0)
+        tasks = [(target, i, self.models[target], folds, cutoff, retrain)
+                 for i, target in enumerate(self.target_columns) if target in self.models]
+
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            _init_worker(X, Y)
+            outcomes = [_evaluate_target(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)),
+                                     initializer=_init_worker, initargs=(X, Y)) as pool:
+                outcomes = list(pool.map(_evaluate_target, tasks))
+
+        # Leading held-out rows of each fold the current models were trained on
+        skip = [min(max(cutoff - a, 0), b - a) if cutoff is not None else 0 for a, b in folds]
+        report = {'rows': int(len(values)), 'samples': int(len(X)), 'lag': self.lag,
+                  'folds': [list(fold) for fold in folds], 'targets': {},
+                  'comparison': {
+                      'current': 'refitted' if cutoff is None else 'holdout',
+                      'cutoff': cutoff,
+                      'samples': int(sum(b - a - s for (a, b), s in zip(folds, skip))),
+                      'note': 'current models trained on unknown rows: scored as their hyperparameters '
+                              'refitted per fold, i.e. the same as the candidates' if cutoff is None else
+                              'current models scored only on held-out samples from the cutoff on, '
+                              'assuming they were trained on the leading rows of this history'
+                  }}
+        retrained = {}
+        for target, candidate, current, final, seconds in outcomes:
+            column = self.target_columns.index(target)
+            actual = [Y[a:b, column] for a, b in folds]
+            if cutoff is None:
+                current = candidate
+            compared = _concatenate([part[s:] for part, s in zip(actual, skip)])
+            compared_candidate = _concatenate([part[s:] for part, s in zip(candidate, skip)])
+            actual, candidate, current = _concatenate(actual), _concatenate(candidate), _concatenate(current)
+            report['targets'][target] = {
+                'seconds': seconds,
+                'params': {key: value for key, value in self.models[target].get_params().items()
+                           if isinstance(value, (int, float, str, bool)) and value == value},
+                'candidate': errors(actual, candidate),
+                'candidate_compared': errors(compared, compared_candidate),
+                'current': errors(compared, current),
+                'candidate_raw': errors(self._unscale(column, actual), self._unscale(column, candidate)),
+                'current_raw': errors(self._unscale(column, compared), self._unscale(column, current))
+            }
+            if final is not None:
+                retrained[target] = final
+        report['summary'] = summarize(report)
+        report['seconds'] = time.perf_counter() - start
+        return report, retrained
+
+
+def summarize(report):
+    """
+    Mean scaled RMSE over targets for the candidates on every held-out row,
+    and for the candidates and the current models on the rows they are compared on
+    """
+    summary = {}
+    for side in ('candidate', 'candidate_compared', 'current'):
+        scores = [metrics[side]['rmse'] for metrics in report['targets'].values() if metrics[side]['rmse'] is not None]
+        summary[f'{side}_rmse'] = float(np.mean(scores)) if scores else None
+    return summary
+
+
+def save_version(models, scaler, report, base_path='models', group='forecast', version=None):
+    """
+    Write retrained models, the scaler they expect and a manifest to
+    <group folder>/versions/<version>/. XGBoost models are saved in the
+    native format, anything else through joblib. Returns the version name.
+    """
+    version = version or datetime.now().strftime('%Y%m%dT%H%M%S')
+    directory = os.path.join(base_path, MODEL_GROUPS[group], VERSIONS_DIR, version)
+    os.makedirs(directory)
+    files = {}
+    for name, model in models.items():
+        if hasattr(model, 'save_model'):
+            files[name] = f'{name}.ubj'
+            model.save_model(os.path.join(directory, files[name]))
+        else:
+            files[name] = f'{name}.joblib'
+            joblib.dump(model, os.path.join(directory, files[name]))
+    files['scaler'] = 'scaler.joblib'
+    joblib.dump(scaler, os.path.join(directory, files['scaler']))
+
+    manifest = {
+        'version': version,
+        'group': group,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'parent': current_version(os.path.join(base_path, MODEL_GROUPS[group])),
+        # Leading history rows the models were fitted on, the cutoff for backtesting them later
+        'trained_rows': report['rows'],
+        'files': files,
+        'backtest': report
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return version
+
+
+def should_promote(report, tolerance=0.0):
+    """
+    Whether the retrained models backtest no worse than the current ones, within
+    `tolerance`, on the rows both were scored on (see report['comparison'])
+    """
+    summary = report['summary']
+    if summary['candidate_compared_rmse'] is None or summary['current_rmse'] is None:
+        return False
+    return summary['candidate_compared_rmse'] <= summary['current_rmse'] * (1 + tolerance)
+
+
+def main(argv=None):
+    from utils.data_processing import DataProcessor
+    from utils.ingestion import load_dataset, data_source
+
+    parser = argparse.ArgumentParser(description='Walk-forward backtest and retraining of the forecast models')
+    parser.add_argument('--data', help='history to evaluate on (default: PM_DATA_PATH or the bundled CSV)')
+    parser.add_argument('--models', default='models')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--lag', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--retrain', action='store_true', help='refit on all rows and write a new version')
+    parser.add_argument('--promote', action='store_true', help='make the new version CURRENT if it is no worse')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='allowed relative RMSE increase when promoting')
+    parser.add_argument('--force', action='store_true', help='promote regardless of the backtest or a missing holdout')
+    parser.add_argument('--report', help='write the backtest report as JSON')
+    args = parser.parse_args(argv)
+
+    processor = DataProcessor()
+    path, cache_dir = data_source()
+    dataset = load_dataset(args.data or path, processor.feature_columns, timedelta(hours=2), cache_dir)
+    values = dataset.fork(cursor=dataset.total_rows).snapshot().matrix(processor.feature_columns)
+
+    registry = ModelRegistry(args.models)
+    models = registry.load()['forecast']
+    manifest = read_manifest(os.path.join(args.models, MODEL_GROUPS['forecast']), registry.versions['forecast'])
+    backtest = WalkForwardBacktest(models, models['scaler'], processor.feature_columns, args.lag,
+                                   args.folds, max_workers=args.workers)
+    report, retrained = backtest.run(values, retrain=args.retrain,
+                                     trained_rows=manifest.get('trained_rows') if manifest else None)
+    report['source'] = {'path': args.data or path, 'models': registry.versions['forecast'] or 'base'}
+
+    print(f"{'target':18s} {'candidate rmse':>15s} {'current rmse':>13s}  (scaled, {len(report['folds'])} folds)")
+    for target, metrics in report['targets'].items():
+        print(f"{target:18s} {metrics['candidate_compared']['rmse'] or float('nan'):15.4f} "
+              f"{metrics['current']['rmse'] or float('nan'):13.4f}")
+    print(f"{'mean':18s} {report['summary']['candidate_compared_rmse'] or float('nan'):15.4f} "
+          f"{report['summary']['current_rmse'] or float('nan'):13.4f}   in {report['seconds']:.1f}s")
+    print(f"Compared on {report['comparison']['samples']} samples: {report['comparison']['note']}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not args.retrain:
+        return 0
+
+    version = save_version(retrained, models['scaler'], report, args.models)
+    print(f"Wrote version {version}")
+    if args.promote and not args.force and report['comparison']['current'] == 'refitted':
+        # The current models saw these rows in training, so the comparison says nothing about new data
+        print(f"Kept the current models: no out-of-sample comparison for {version}; use --force to promote anyway")
+    elif args.promote and (args.force or should_promote(report, args.tolerance)):
+        set_current_version(os.path.join(args.models, MODEL_GROUPS['forecast']), version)
+        print(f"Promoted {version}; POST /api/models/reload with the admin token to serve it")
+    elif args.promote:
+        print(f"Kept the current models: {version} backtests worse")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import threading
+
+import numpy as np
+
+
+class BreakdownHistory:
+    def __init__(self, outputs, scorer, capacity=1024):
+        """
+        Append-only series of breakdown probabilities, one row per data row.
+
+        `scorer` maps an (n_rows, n_features) block to (n_rows, len(outputs))
+        probabilities. History is scored in one vectorized call, and each
+        tick adds a single row, so any range can be served as a slice.
+        """
+        self.outputs = list(outputs)
+        self.scorer = scorer
+        self._probabilities = np.empty((max(capacity, 1), len(self.outputs)))
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _ensure_capacity(self, size):
+        if size > len(self._probabilities):
+            grown = np.empty((max(size, 2 * len(self._probabilities)), len(self.outputs)))
+            grown[:self.count] = self._probabilities[:self.count]
+            self._probabilities = grown
+
+    def extend(self, rows):
+        """Score a block of rows in one call and append the results, oldest first"""
+        rows = np.asarray(rows, dtype=float)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if len(rows) == 0:
+            return np.empty((0, len(self.outputs)))
+        probabilities = np.asarray(self.scorer(rows), dtype=float).reshape(len(rows), len(self.outputs))
+        with self._lock:
+            self._ensure_capacity(self.count + len(rows))
+            self._probabilities[self.count:self.count + len(rows)] = probabilities
+            self.count += len(rows)
+        return probabilities
+
+    def append(self, row):
+        """Score one new row and return its probabilities"""
+        return self.extend(row)[0]
+
+    def probabilities(self, start=0, end=None):
+        """Probabilities for rows [start, end), shape (n_rows, n_outputs)"""
+        with self._lock:
+            end = self.count if end is None else min(end, self.count)
+            start = min(max(start, 0), end)
+            return self._probabilities[start:end].copy()
@@ -1,9 +1,14 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from sklearn.preprocessing import StandardScaler,MinMaxScaler
 import warnings
 
+from utils.forecasting import build_lag_matrix
+from utils.health import health_scores
+from utils.rolling_features import rolling_feature_matrix, feature_names
+
 warnings.filterwarnings('ignore')
 
 class DataProcessor:
@@ -40,39 +45,35 @@ class DataProcessor:
     def create_sequences(self, data, sequence_length=10, target_columns=None):
         """
         Create sequences for time series prediction
+        Sequences are read-only sliding views over `data`, so no window is copied
         """
         if target_columns is None:
             target_columns = self.feature_columns
-            
-        sequences = []
-        targets = []
-        
-        for i in range(len(data) - sequence_length):
-            sequences.append(data[i:i+sequence_length])
-            targets.append(data[i+sequence_length])
-        
-        return np.array(sequences), np.array(targets)
+
+        data = np.asarray(data)
+        if len(data) <= sequence_length:
+            return np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype), data[:0]
+
+        # windows[i] is data[i:i+sequence_length], with the window axis moved back in front of the features
+        windows = sliding_window_view(data, sequence_length, axis=0)
+        sequences = np.moveaxis(windows, -1, 1)[:len(data) - sequence_length]
+        targets = data[sequence_length:]
+
+        return sequences, targets
     
     def calculate_statistical_features(self, df, window_size=24):
         """
         Calculate rolling statistical features
+        window_size may also be a list to compute several windows at once
         """
         features_df = df.copy()
+        window_sizes = [window_size] if np.isscalar(window_size) else list(window_size)
+        columns = [col for col in self.feature_columns if col in features_df.columns]
         
-        for col in self.feature_columns:
-            if col in features_df.columns:
-                # Rolling statistics
-                features_df[f'{col}_mean_{window_size}h'] = features_df[col].rolling(window=window_size, min_periods=1).mean()
-                features_df[f'{col}_std_{window_size}h'] = features_df[col].rolling(window=window_size, min_periods=1).std()
-                features_df[f'{col}_min_{window_size}h'] = features_df[col].rolling(window=window_size, min_periods=1).min()
-                features_df[f'{col}_max_{window_size}h'] = features_df[col].rolling(window=window_size, min_periods=1).max()
-                
-                # Lag features
-                features_df[f'{col}_lag_1'] = features_df[col].shift(1)
-                features_df[f'{col}_lag_24'] = features_df[col].shift(24)
-                
-                # Rate of change
-                features_df[f'{col}_roc'] = features_df[col].pct_change()
+        # Rolling statistics, lag features and rate of change in one vectorized pass
+        matrix = rolling_feature_matrix(features_df[columns].values, window_sizes)
+        rolling_df = pd.DataFrame(matrix, columns=feature_names(columns, window_sizes), index=features_df.index)
+        features_df = pd.concat([features_df, rolling_df], axis=1)
         
         return features_df.fillna(method='ffill').fillna(0)
     
@@ -101,60 +102,34 @@ class DataProcessor:
         if df.empty:
             return pd.Series()
         
-        health_scores = []
+        fault_cols = [col for col in self.fault_columns if col in df.columns]
+        params = [param for param in self.feature_columns if param in df.columns]
+        values = df[params].values.astype(float)
         
-        for idx, row in df.iterrows():
-            # Base score starts at 100
-            score = 100.0
-            
-            # Deduct points for faults
-            for fault_col in self.fault_columns:
-                if fault_col in row and row[fault_col] == 1:
-                    score -= 30  # Each fault reduces score by 30 points
-            
-            # Deduct points for parameter deviations
-            for param in self.feature_columns:
-                if param in row:
-                    # Calculate deviation from normal range (simplified)
-                    param_mean = df[param].mean()
-                    param_std = df[param].std()
-                    deviation = abs(row[param] - param_mean) / max(param_std, 0.1)
-                    
-                    if deviation > 2:  # More than 2 standard deviations
-                        score -= min(20, deviation * 5)  # Max 20 points deduction per parameter
-            
-            health_scores.append(max(0, min(100, score)))  # Keep score between 0 and 100
+        # Deviation is measured against the statistics of the whole frame
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            stds = np.nanstd(values, axis=0, ddof=1)
         
-        return pd.Series(health_scores, index=df.index)
+        scores = health_scores(values, df[fault_cols].values, means, stds)
+        return pd.Series(scores, index=df.index)
     
 
     def XGBoost_forecast(df, models, target_columns, scaler,lag=10):
         target_columns = df.columns
         scaled_data = scaler.transform(df)
-        scaled_df = pd.DataFrame(scaled_data, columns=df.columns)
 
-        Pred = {}
+        # The lagged matrix is the same for every target, so build it once
+        X = build_lag_matrix(scaled_data, lag)
+
         y_pred_unscaled = {}
 
         for i, target_col in enumerate(target_columns):
-            lagged_columns = []
-            for col in df.columns:
-                for j in range(1, 11):
-                    lagged = scaled_df[col].shift(j)
-                    lagged.name = f'{col}_lag{j}'
-                    lagged_columns.append(lagged)
-
-            lagged_df = pd.concat(lagged_columns, axis=1)
-            lagged_df['target'] = scaled_df[target_col]
-            lagged_df = lagged_df.dropna()
-
-            X = lagged_df.drop(columns='target')
-            y = lagged_df['target']
-
             y_pred = models[target_col].predict(X)
             y_pred_temp = y_pred.reshape(-1, 1)
 
-            dummy_pred = np.zeros((len(y_pred_temp), scaled_df.shape[1]))  # Correct shape
+            dummy_pred = np.zeros((len(y_pred_temp), scaled_data.shape[1]))  # Correct shape
             dummy_pred[:, i] = y_pred_temp.flatten()
             y_pred_unscaled[target_col] = scaler.inverse_transform(dummy_pred)[:, i]
         return y_pred_unscaled
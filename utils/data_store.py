@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class SensorDataStore:
+    shared = False
+
+    def __init__(self, columns, values, base_time, interval, cursor=0, path=None):
+        """
+        Read-only columnar sensor history with a thread-safe reveal cursor.
+
+        `values` is laid out as (n_columns, n_rows), so every tag is one
+        contiguous array. Readers take a DataSnapshot, which pins the cursor
+        once and hands out views instead of copies. `path` names the .npy
+        file the values are memory-mapped from, when they are.
+        """
+        self.columns = list(columns)
+        self.path = path
+        self._values = np.ascontiguousarray(values, dtype=float)
+        self._values.flags.writeable = False
+        self._positions = {col: i for i, col in enumerate(self.columns)}
+        self.base_time = base_time
+        self.interval = interval
+        self.total_rows = self._values.shape[1] if self._values.ndim == 2 else 0
+        self._lock = threading.Lock()
+        self._cursor = min(cursor, self.total_rows)
+
+    @classmethod
+    def from_dataframe(cls, df, columns, base_time, interval, cursor=0):
+        """Build a store from the given DataFrame columns"""
+        columns = [col for col in columns if col in df.columns]
+        values = np.empty((len(columns), len(df)))
+        for i, col in enumerate(columns):
+            values[i] = df[col].values
+        return cls(columns, values, base_time, interval, cursor)
+
+    @classmethod
+    def empty(cls, columns, base_time, interval):
+        return cls(columns, np.empty((len(columns), 0)), base_time, interval)
+
+    def fork(self, cursor=0, asset_id=None):
+        """A store with its own cursor over the same read-only values"""
+        return SensorDataStore(self.columns, self._values, self.base_time, self.interval, cursor, self.path)
+
+    @property
+    def cursor(self):
+        with self._lock:
+            return self._cursor
+
+    def advance(self, rows=1):
+        """Reveal up to `rows` more rows and return the new cursor"""
+        with self._lock:
+            self._cursor = min(self._cursor + rows, self.total_rows)
+            return self._cursor
+
+    def position(self, column):
+        return self._positions[column]
+
+    def snapshot(self, end=None):
+        """Consistent view of the rows revealed so far, optionally cut at `end`"""
+        cursor = self.cursor
+        if end is not None:
+            cursor = min(max(end, 0), cursor)
+        return DataSnapshot(self, cursor)
+
+
+class DataSnapshot:
+    def __init__(self, store, end):
+        """Read-only view of the first `end` rows of a SensorDataStore"""
+        self.store = store
+        self.end = end
+
+    def __len__(self):
+        return self.end
+
+    @property
+    def empty(self):
+        return self.end == 0
+
+    @property
+    def columns(self):
+        return self.store.columns
+
+    def column(self, name, start=0, end=None):
+        """Zero-copy view of one tag"""
+        end = self.end if end is None else min(end, self.end)
+        return self.store._values[self.store.position(name), start:end]
+
+    def row(self, index, names):
+        """Values of the given tags at one row, negative indices counting from the end"""
+        if index < 0:
+            index += self.end
+        if not 0 <= index < self.end:
+            raise IndexError(f"Row {index} is outside the snapshot")
+        positions = [self.store.position(name) for name in names]
+        return self.store._values[positions, index]
+
+    def matrix(self, names, start=0, end=None):
+        """Rows as an (n_rows, n_names) array for model input"""
+        end = self.end if end is None else min(end, self.end)
+        positions = [self.store.position(name) for name in names]
+        return self.store._values[positions, start:end].T
+
+    def timestamp(self, index):
+        """Timestamp of one row"""
+        if index < 0:
+            index += self.end
+        return self.store.base_time + index * self.store.interval
+
+    def timestamps(self, start=0, end=None):
+        """Timestamps for a range of rows, generated from the base time and interval"""
+        end = self.end if end is None else min(end, self.end)
+        offsets = pd.to_timedelta(np.arange(start, end) * self.store.interval.total_seconds(), unit='s')
+        return pd.Timestamp(self.store.base_time) + offsets
+
+    def timestamps_at(self, indices):
+        """Timestamps for arbitrary row indices"""
+        offsets = pd.to_timedelta(np.asarray(indices) * self.store.interval.total_seconds(), unit='s')
+        return pd.Timestamp(self.store.base_time) + offsets
+
+    def to_frame(self, start=0, end=None):
+        """Materialise the snapshot as a DataFrame for the batch DataProcessor methods"""
+        end = self.end if end is None else min(end, self.end)
+        df = pd.DataFrame(
+            {col: self.column(col, start, end) for col in self.columns},
+            index=pd.RangeIndex(start, end)
+        )
+        df['timestamp'] = self.timestamps(start, end)
+        return df
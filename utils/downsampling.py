@@ -0,0 +1,248 @@
+import threading
+
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets over several series at once.
+
+    `x` and `y` are (n_series, n_points) with x increasing along each row.
+    Returns (n_series, threshold) positions into the points, always keeping
+    the first and last point. With no more points than the threshold every
+    position is returned.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n_series, n_points = y.shape
+    if threshold >= n_points or threshold < 3:
+        return np.tile(np.arange(n_points), (n_series, 1))
+
+    rows = np.arange(n_series)
+    # Prefix sums give the mean of any bucket in O(1)
+    x_prefix = np.concatenate([np.zeros((n_series, 1)), np.cumsum(x, axis=1)], axis=1)
+    y_prefix = np.concatenate([np.zeros((n_series, 1)), np.cumsum(y, axis=1)], axis=1)
+    every = (n_points - 2) / (threshold - 2)
+
+    selected = np.empty((n_series, threshold), dtype=np.int64)
+    selected[:, 0] = 0
+    selected[:, -1] = n_points - 1
+    a = np.zeros(n_series, dtype=np.int64)
+    for i in range(threshold - 2):
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        next_start = range_end
+        next_end = min(int((i + 2) * every) + 1, n_points)
+        if next_start >= next_end:
+            next_start, next_end = n_points - 1, n_points
+        count = next_end - next_start
+        avg_x = (x_prefix[:, next_end] - x_prefix[:, next_start]) / count
+        avg_y = (y_prefix[:, next_end] - y_prefix[:, next_start]) / count
+
+        ax = x[rows, a].reshape(-1, 1)
+        ay = y[rows, a].reshape(-1, 1)
+        area = np.abs(
+            (ax - avg_x.reshape(-1, 1)) * (y[:, range_start:range_end] - ay)
+            - (ax - x[:, range_start:range_end]) * (avg_y.reshape(-1, 1) - ay)
+        )
+        a = range_start + np.argmax(area, axis=1)
+        selected[:, i + 1] = a
+    return selected
+
+
+def _reduce(mins, maxs, argmins, argmaxs, sums, group):
+    """
+    Combine every `group` consecutive buckets, padding the last group with neutral buckets.
+    With argmins/argmaxs of None the inputs are raw rows and their own indices are used.
+    """
+    n_buckets, n_series = mins.shape
+    n_groups = -(-n_buckets // group)
+    pad = n_groups * group - n_buckets
+
+    def padded(values, fill):
+        if pad:
+            values = np.concatenate([values, np.full((pad, n_series), fill, dtype=values.dtype)])
+        return values.reshape(n_groups, group, n_series)
+
+    def extreme(values, positions, better):
+        # Walk the short group axis; strict comparisons keep the first extreme, like argmin
+        best, offset = values[:, 0], np.zeros((n_groups, n_series), dtype=np.int64)
+        for k in range(1, group):
+            replace = better(values[:, k], best)
+            best = np.where(replace, values[:, k], best)
+            offset = np.where(replace, k, offset)
+        if positions is None:
+            return best, np.arange(n_groups).reshape(-1, 1) * group + offset
+        return best, np.take_along_axis(padded(positions, 0), offset[:, None, :], axis=1)[:, 0]
+
+    low, low_position = extreme(padded(mins, np.inf), argmins, np.less)
+    high, high_position = extreme(padded(maxs, -np.inf), argmaxs, np.greater)
+    return low, high, low_position, high_position, padded(sums, 0).sum(axis=1)
+
+
+class _Level:
+    def __init__(self, size, n_series, n_buckets):
+        """Per-bucket min, max, their row indices and sum for buckets of `size` rows"""
+        self.size = size
+        self.min = np.full((n_buckets, n_series), np.inf)
+        self.max = np.full((n_buckets, n_series), -np.inf)
+        self.argmin = np.zeros((n_buckets, n_series), dtype=np.int64)
+        self.argmax = np.zeros((n_buckets, n_series), dtype=np.int64)
+        self.sum = np.zeros((n_buckets, n_series))
+
+    def ensure(self, n_buckets):
+        if n_buckets > len(self.min):
+            size = max(n_buckets, 2 * len(self.min))
+            for name, fill in (('min', np.inf), ('max', -np.inf), ('argmin', 0), ('argmax', 0), ('sum', 0)):
+                old = getattr(self, name)
+                grown = np.full((size, old.shape[1]), fill, dtype=old.dtype)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+
+    def fill(self, mins, maxs, argmins, argmaxs, sums):
+        self.ensure(len(mins))
+        self.min[:len(mins)], self.max[:len(mins)] = mins, maxs
+        self.argmin[:len(mins)], self.argmax[:len(mins)] = argmins, argmaxs
+        self.sum[:len(mins)] = sums
+
+
+class DownsamplingPyramid:
+    def __init__(self, n_series, base=4, factor=4, capacity=1024):
+        """
+        Multi-resolution min/max/mean summary of several series.
+
+        Level k has buckets of base * factor**k rows. Each new row updates one
+        bucket per level, and levels are added as history grows, so any range
+        can be summarised from the first level with few enough buckets.
+        Levels start with room for `capacity` rows and double when full, so
+        memory follows the rows revealed rather than the whole history.
+        """
+        self.n_series = n_series
+        self.base = base
+        self.factor = factor
+        self.capacity = max(capacity, 1)
+        self.levels = [_Level(base, n_series, -(-self.capacity // base))]
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _add_levels(self):
+        while self.count > self.levels[-1].size:
+            below = self.levels[-1]
+            n_buckets = -(-self.count // below.size)
+            size = below.size * self.factor
+            level = _Level(size, self.n_series, -(-max(self.count, self.capacity) // size))
+            level.fill(*_reduce(below.min[:n_buckets], below.max[:n_buckets], below.argmin[:n_buckets],
+                                below.argmax[:n_buckets], below.sum[:n_buckets], self.factor))
+            self.levels.append(level)
+
+    def prime(self, values):
+        """Summarise a block of history in one vectorized pass"""
+        values = np.asarray(values, dtype=float).reshape(-1, self.n_series)
+        if self.count or len(values) == 0:
+            return self.extend(values)
+        with self._lock:
+            n_rows = len(values)
+            self.levels[0].fill(*_reduce(values, values, None, None, values, self.base))
+            self.count = n_rows
+            self._add_levels()
+
+    def extend(self, values):
+        for row in np.asarray(values, dtype=float).reshape(-1, self.n_series):
+            self.append(row)
+
+    def append(self, row):
+        """Add one row to every level"""
+        row = np.asarray(row, dtype=float)
+        with self._lock:
+            t = self.count
+            for level in self.levels:
+                b = t // level.size
+                level.ensure(b + 1)
+                if t % level.size == 0:
+                    level.min[b] = level.max[b] = level.sum[b] = row
+                    level.argmin[b] = level.argmax[b] = t
+                    continue
+                lower = row < level.min[b]
+                higher = row > level.max[b]
+                level.min[b, lower] = row[lower]
+                level.argmin[b, lower] = t
+                level.max[b, higher] = row[higher]
+                level.argmax[b, higher] = t
+                level.sum[b] += row
+            self.count += 1
+            self._add_levels()
+
+    def buckets(self, start, end, max_buckets, raw):
+        """
+        Min/max/mean buckets covering rows [start, end), at most about max_buckets of them.
+
+        Buckets follow the level grid; the two edge buckets are recomputed from
+        `raw(lo, hi)` (an (hi - lo, n_series) array) so nothing outside the range
+        leaks in. Returns None when the range needs no downsampling.
+        """
+        with self._lock:
+            end = min(end, self.count)
+            start = min(max(start, 0), end)
+            if end - start <= max_buckets:
+                return None
+            level = next((level for level in self.levels
+                          if (end - 1) // level.size - start // level.size + 1 <= max_buckets), self.levels[-1])
+            size = level.size
+            first, last = start // size, (end - 1) // size
+            result = {
+                'min': level.min[first:last + 1].copy(),
+                'max': level.max[first:last + 1].copy(),
+                'argmin': level.argmin[first:last + 1].copy(),
+                'argmax': level.argmax[first:last + 1].copy(),
+                'sum': level.sum[first:last + 1].copy()
+            }
+            count = self.count
+
+        starts = np.maximum(np.arange(first, last + 1) * size, start)
+        ends = np.minimum((np.arange(first, last + 1) + 1) * size, end)
+        for position, lo, hi, partial in (
+            (0, starts[0], ends[0], start > first * size),
+            (-1, starts[-1], ends[-1], end < min((last + 1) * size, count))
+        ):
+            if not partial:
+                continue
+            rows = raw(lo, hi)
+            result['min'][position] = rows.min(axis=0)
+            result['max'][position] = rows.max(axis=0)
+            result['argmin'][position] = lo + rows.argmin(axis=0)
+            result['argmax'][position] = lo + rows.argmax(axis=0)
+            result['sum'][position] = rows.sum(axis=0)
+
+        result['mean'] = result.pop('sum') / (ends - starts).reshape(-1, 1)
+        result['start'] = starts
+        result['end'] = ends
+        return result
+
+    def lttb(self, start, end, max_points, raw):
+        """
+        Up to max_points row indices per series for [start, end), chosen by LTTB
+        among the range ends and the extremes of about max_points buckets.
+        Returns an (n_series, k) index array, or None when no downsampling is needed.
+        """
+        end = min(end, self.count)
+        start = min(max(start, 0), end)
+        if end - start <= max_points:
+            return None
+        summary = self.buckets(start, end, max(max_points // 2, 1), raw)
+        if summary is None:
+            return None
+
+        # Each bucket contributes its min and max, in row order
+        low, high = summary['argmin'].T, summary['argmax'].T
+        low_first = low <= high
+        indices = np.stack([np.where(low_first, low, high), np.where(low_first, high, low)], axis=2)
+        values = np.stack([np.where(low_first, summary['min'].T, summary['max'].T),
+                           np.where(low_first, summary['max'].T, summary['min'].T)], axis=2)
+        indices = np.concatenate([
+            np.full((self.n_series, 1), start), indices.reshape(self.n_series, -1), np.full((self.n_series, 1), end - 1)
+        ], axis=1)
+        values = np.concatenate([
+            raw(start, start + 1).T, values.reshape(self.n_series, -1), raw(end - 1, end).T
+        ], axis=1)
+        chosen = lttb(indices, values, max_points)
+        return np.take_along_axis(indices, chosen, axis=1)
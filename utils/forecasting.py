@@ -0,0 +1,145 @@
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.metrics import MODEL_LATENCY
+
+
+def build_lag_matrix(scaled_data, lag=10):
+    """
+    Build the lagged design matrix for a block of scaled rows.
+
+    Row k holds the features used to predict row k + lag, laid out the way the
+    forecast models were trained: for each column, lag 1 through lag `lag`.
+    """
+    scaled_data = np.asarray(scaled_data, dtype=float)
+    n_rows, n_features = scaled_data.shape
+    if n_rows <= lag:
+        return np.empty((0, n_features * lag))
+
+    # windows[k] covers rows k .. k+lag-1 (oldest first) without copying
+    windows = sliding_window_view(scaled_data[:-1], lag, axis=0)
+    return windows[:, :, ::-1].reshape(n_rows - lag, n_features * lag)
+
+
+class LagFeatureBuffer:
+    def __init__(self, n_features, lag=10):
+        """
+        Ring buffer of the most recent scaled rows.
+
+        Every row is written twice, `lag` slots apart, so the latest `lag`
+        rows are always one contiguous slice of the buffer and can be handed
+        out as a view instead of being reassembled on each read.
+        """
+        self.n_features = n_features
+        self.lag = lag
+        self._buffer = np.zeros((n_features, 2 * lag))
+        self._head = 0
+        self.count = 0
+
+        # Feature row shared by every model, refreshed once per append
+        self._features = np.zeros((1, n_features * lag))
+
+    def append(self, scaled_row):
+        """Push one scaled row and refresh the shared feature row"""
+        self._head = (self._head - 1) % self.lag
+        self._buffer[:, self._head] = scaled_row
+        self._buffer[:, self._head + self.lag] = scaled_row
+        self.count += 1
+        np.copyto(self._features.reshape(self.n_features, self.lag), self.window())
+
+    def extend(self, scaled_rows):
+        """Push several scaled rows, oldest first"""
+        for row in scaled_rows[-self.lag:]:
+            self.append(row)
+        self.count += max(0, len(scaled_rows) - self.lag)
+
+    def window(self):
+        """View of the latest rows as (n_features, lag), most recent lag first"""
+        return self._buffer[:, self._head:self._head + self.lag]
+
+    def features(self):
+        """Lagged feature row in model column order, or None until the buffer is full"""
+        if self.count < self.lag:
+            return None
+        return self._features
+
+
+class ForecastEngine:
+    def __init__(self, models, scaler, target_columns, lag=10, compiled=None):
+        """
+        Recursive multi-step forecaster for the per-tag XGBoost models.
+
+        Keeps a LagFeatureBuffer of scaled rows, so a simulation tick only
+        scales and pushes the newly revealed row, and a forecast only touches
+        the last `lag` rows regardless of how much history has been revealed.
+        With `compiled` (a verified CompiledBoosters over `target_columns`),
+        each horizon step scores every model in one call.
+        """
+        self.models = models
+        self.compiled = compiled
+        self.scaler = scaler
+        self.target_columns = list(target_columns)
+        self.lag = lag
+        self.buffer = LagFeatureBuffer(len(self.target_columns), lag)
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.buffer.count
+
+    def prime(self, values):
+        """Load a block of raw rows at once, oldest first"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        with MODEL_LATENCY.time(group='forecast', model='scaler', stage='transform'):
+            scaled = self.scaler.transform(values)
+        with self._lock:
+            self.buffer.extend(scaled)
+
+    def append(self, row):
+        """Reveal one raw row"""
+        with MODEL_LATENCY.time(group='forecast', model='scaler', stage='transform'):
+            scaled_row = self.scaler.transform(np.asarray(row, dtype=float).reshape(1, -1))[0]
+        with self._lock:
+            self.buffer.append(scaled_row)
+
+    def forecast(self, steps=10):
+        """
+        Predict the next `steps` rows for every target.
+
+        Each horizon step scores all models on one shared feature row, then
+        feeds the predicted row back into the lag window for the next step.
+        The lock is only held to copy the window, so ticks are never blocked.
+        """
+        n_targets = len(self.target_columns)
+        with self._lock:
+            ready = self.buffer.features() is not None
+            window = self.buffer.window().copy()
+        if steps <= 0 or not ready:
+            return {target: np.empty(0) for target in self.target_columns}
+
+        features = window.reshape(1, n_targets * self.lag)
+        predicted = np.empty((steps, n_targets))
+
+        for step in range(steps):
+            if self.compiled is not None:
+                # One call scores every tag, so there are no per-tag samples on this path
+                with MODEL_LATENCY.time(group='forecast', model='compiled', stage='predict'):
+                    predicted[step] = self.compiled.predict(features)[0]
+            else:
+                for i, target in enumerate(self.target_columns):
+                    start = time.perf_counter()
+                    predicted[step, i] = self.models[target].predict(features)[0]
+                    MODEL_LATENCY.observe(time.perf_counter() - start, group='forecast', model=target,
+                                          stage='predict')
+            # Shift every lag down by one and put the new row at lag 1
+            window[:, 1:] = window[:, :-1].copy()
+            window[:, 0] = predicted[step]
+
+        with MODEL_LATENCY.time(group='forecast', model='scaler', stage='inverse_transform'):
+            unscaled = self.scaler.inverse_transform(predicted)
+        return {target: unscaled[:, i] for i, target in enumerate(self.target_columns)}
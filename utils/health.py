@@ -0,0 +1,84 @@
+import threading
+
+import numpy as np
+
+from utils.running_stats import RunningStats, expanding_mean_std
+
+
+def health_scores(values, faults, means, stds):
+    """
+    Equipment health score for each row.
+
+    Starts at 100, takes 30 points per active fault and up to 20 points per
+    parameter deviating more than 2 standard deviations from its mean, then
+    clips to [0, 100]. `means` and `stds` broadcast against `values`.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    faults = np.atleast_2d(np.asarray(faults, dtype=float))
+    score = np.full(len(values), 100.0)
+
+    for j in range(faults.shape[1]):
+        score -= 30 * (faults[:, j] == 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviation = np.abs(values - means) / np.maximum(stds, 0.1)
+        penalty = np.where(deviation > 2, np.minimum(20, deviation * 5), 0)
+    for j in range(values.shape[1]):
+        score -= penalty[:, j]
+
+    return np.clip(score, 0, 100)
+
+
+class HealthScoreTracker:
+    def __init__(self, n_features, capacity=1024):
+        """
+        Streaming health scores.
+
+        Each row is scored against the running mean and std of every row
+        revealed so far (itself included), kept with Welford updates, so a new
+        row costs O(n_features) however long the history is.
+        """
+        self.stats = RunningStats(n_features)
+        self._scores = np.empty(max(capacity, 1))
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _ensure_capacity(self, size):
+        if size > len(self._scores):
+            grown = np.empty(max(size, 2 * len(self._scores)))
+            grown[:self.count] = self._scores[:self.count]
+            self._scores = grown
+
+    def extend(self, values, faults):
+        """Score a block of rows at once, oldest first"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        if self.count == 0:
+            means, stds = expanding_mean_std(values)
+            scores = health_scores(values, faults, means, stds)
+            with self._lock:
+                self._ensure_capacity(len(scores))
+                self._scores[:len(scores)] = scores
+                self.stats.extend(values)
+                self.count = len(scores)
+        else:
+            for row, fault_row in zip(values, np.asarray(faults)):
+                self.append(row, fault_row)
+
+    def append(self, row, fault_row):
+        """Score one new row and return its score"""
+        with self._lock:
+            self.stats.update(row)
+            score = health_scores(row, fault_row, self.stats.mean, self.stats.std)[0]
+            self._ensure_capacity(self.count + 1)
+            self._scores[self.count] = score
+            self.count += 1
+        return score
+
+    def scores(self, start=0, end=None):
+        """Scores for rows [start, end)"""
+        with self._lock:
+            end = self.count if end is None else min(end, self.count)
+            start = min(max(start, 0), end)
+            return self._scores[start:end].copy()
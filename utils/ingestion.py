@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import SensorDataStore
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+DEFAULT_DATA_PATH = 'data/Cleared_df0.csv'
+DEFAULT_CACHE_DIR = 'data/cache'
+
+SOURCE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.npy': 'npy'
+}
+
+
+def data_source():
+    """Dataset path and cache directory, overridable with PM_DATA_PATH and PM_DATA_CACHE"""
+    cache_dir = os.environ.get('PM_DATA_CACHE', DEFAULT_CACHE_DIR)
+    return os.environ.get('PM_DATA_PATH', DEFAULT_DATA_PATH), (cache_dir or None)
+
+
+def source_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SOURCE_FORMATS:
+        raise ValueError(f"Unsupported data format '{extension}' for {path}")
+    return SOURCE_FORMATS[extension]
+
+
+def cache_path(path, cache_dir):
+    """Location of the memory-mapped cache for a source file"""
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.npy')
+
+
+def _meta_path(npy_path):
+    return os.path.splitext(npy_path)[0] + '.json'
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _count_lines(path, block_size=1 << 20):
+    """Number of data rows in a CSV file, counted in fixed-size blocks"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def _timing(timestamps):
+    """First timestamp and median sample interval of a block of parsed timestamps"""
+    timestamps = pd.to_datetime(pd.Series(timestamps), errors='coerce').dropna()
+    if timestamps.empty:
+        return None, None
+    interval = None
+    if len(timestamps) > 1:
+        interval = float(np.median(np.diff(timestamps.values).astype('timedelta64[ns]').astype(np.int64))) / 1e9
+    return timestamps.iloc[0].isoformat(), interval
+
+
+def _select_columns(values, order, n_rows, target=None, chunk_rows=100000):
+    """
+    Copy the columns `order` of an (n_columns, n_rows) array, up to row
+    `n_rows`, chunk by chunk into memory or into a memory-mapped .npy at
+    `target`. A memory-mapped source is never read into RAM as a whole.
+    """
+    shape = (len(order), n_rows)
+    if target is None:
+        selected = np.empty(shape)
+    else:
+        tmp = f'{target}.{os.getpid()}.part'
+        selected = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float64, shape=shape)
+    for row, column in enumerate(order):
+        for start in range(0, n_rows, chunk_rows):
+            end = min(start + chunk_rows, n_rows)
+            selected[row, start:end] = values[column, start:end]
+    if target is None:
+        return selected
+    selected.flush()
+    del selected
+    os.replace(tmp, target)
+    return np.load(target, mmap_mode='r')
+
+
+def _selection_path(npy_path, columns):
+    """Location of a reordered copy of a memory-mapped dataset holding `columns`"""
+    digest = hashlib.blake2b('|'.join(columns).encode(), digest_size=6).hexdigest()
+    return f'{os.path.splitext(npy_path)[0]}-{digest}.npy'
+
+
+class _ColumnWriter:
+    def __init__(self, columns, n_rows, target=None):
+        """Fills an (n_columns, n_rows) array block by block, on disk when a target is given"""
+        self.target = target
+        self.shape = (len(columns), n_rows)
+        if target is None:
+            self.values = np.empty(self.shape)
+        else:
+            # Per process, so concurrent conversions of one source never share a temp file
+            self._tmp = f'{target}.{os.getpid()}.tmp'
+            self.values = np.lib.format.open_memmap(self._tmp, mode='w+', dtype=np.float64, shape=self.shape)
+        self.position = 0
+
+    def write(self, block):
+        """Append an (n_rows, n_columns) block"""
+        end = self.position + len(block)
+        self.values[:, self.position:end] = block.T
+        self.position = end
+
+    def finish(self):
+        compact = self.position != self.shape[1]
+        order = range(self.shape[0])
+        if self.target is None:
+            # Blank or multi-line records make the line count differ; drop the unused rows
+            return _select_columns(self.values, order, self.position) if compact else self.values
+        if compact:
+            values = _select_columns(self.values, order, self.position, self.target)
+            del self.values
+            os.remove(self._tmp)
+            return values
+        self.values.flush()
+        del self.values
+        os.replace(self._tmp, self.target)
+        return np.load(self.target, mmap_mode='r')
+
+
+def _read_csv(path, columns, writer_for, chunk_rows, timestamp_column):
+    header = pd.read_csv(path, nrows=0).columns
+    present = [col for col in columns if col in header]
+    usecols = present + ([timestamp_column] if timestamp_column in header else [])
+    writer = writer_for(present, _count_lines(path))
+    timing = (None, None)
+    for i, chunk in enumerate(pd.read_csv(path, usecols=usecols, chunksize=chunk_rows)):
+        if i == 0 and timestamp_column in chunk.columns:
+            timing = _timing(chunk[timestamp_column])
+        writer.write(chunk[present].to_numpy(dtype=np.float64))
+    return present, writer, timing
+
+
+def _read_parquet(path, columns, writer_for, chunk_rows, timestamp_column):
+    parquet = pyarrow.parquet.ParquetFile(path)
+    names = parquet.schema_arrow.names
+    present = [col for col in columns if col in names]
+    read = present + ([timestamp_column] if timestamp_column in names else [])
+    writer = writer_for(present, parquet.metadata.num_rows)
+    timing = (None, None)
+    for i, batch in enumerate(parquet.iter_batches(batch_size=chunk_rows, columns=read)):
+        if i == 0 and timestamp_column in batch.schema.names:
+            timing = _timing(batch.column(timestamp_column).to_pandas())
+        writer.write(np.column_stack([
+            batch.column(col).to_numpy(zero_copy_only=False).astype(np.float64) for col in present
+        ]).reshape(batch.num_rows, len(present)))
+    return present, writer, timing
+
+
+def _read_arrow(path, columns, writer_for, chunk_rows, timestamp_column):
+    with pyarrow.memory_map(path) as source:
+        reader = pyarrow.ipc.open_file(source)
+        names = reader.schema.names
+        present = [col for col in columns if col in names]
+        n_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        writer = writer_for(present, n_rows)
+        timing = (None, None)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if i == 0 and timestamp_column in names:
+                timing = _timing(batch.column(timestamp_column).to_pandas())
+            writer.write(np.column_stack([
+                batch.column(col).to_numpy(zero_copy_only=False).astype(np.float64) for col in present
+            ]).reshape(batch.num_rows, len(present)))
+    return present, writer, timing
+
+
+READERS = {'csv': _read_csv, 'parquet': _read_parquet, 'arrow': _read_arrow}
+
+
+def convert(path, columns, cache_dir=None, chunk_rows=100000, timestamp_column='timestamp'):
+    """
+    Read a source file block by block into an (n_columns, n_rows) array.
+
+    With a cache directory the array is written to a memory-mapped .npy
+    file plus a JSON sidecar, so memory use is bounded by the block size and
+    later loads skip parsing entirely. Returns (values, meta).
+    """
+    kind = source_format(path)
+    if kind in ('parquet', 'arrow') and pyarrow is None:
+        raise ImportError(f"pyarrow is required to read {path}")
+
+    target = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        target = cache_path(path, cache_dir)
+
+    def writer_for(present, n_rows):
+        return _ColumnWriter(present, n_rows, target)
+
+    present, writer, (first_timestamp, interval_seconds) = READERS[kind](
+        path, list(columns), writer_for, chunk_rows, timestamp_column
+    )
+    values = writer.finish()
+    meta = dict(_source_signature(path), requested=list(columns), columns=present, n_rows=int(values.shape[1]),
+                first_timestamp=first_timestamp, interval_seconds=interval_seconds)
+    if target is not None:
+        tmp = f'{_meta_path(target)}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, _meta_path(target))
+    return values, meta
+
+
+def open_cache(npy_path):
+    """Memory-map a converted dataset and read its sidecar"""
+    with open(_meta_path(npy_path)) as f:
+        meta = json.load(f)
+    return np.load(npy_path, mmap_mode='r'), meta
+
+
+def _cache_is_fresh(path, npy_path, columns):
+    if not (os.path.exists(npy_path) and os.path.exists(_meta_path(npy_path))):
+        return False
+    with open(_meta_path(npy_path)) as f:
+        meta = json.load(f)
+    signature = _source_signature(path)
+    return all(meta.get(key) == value for key, value in signature.items()) and \
+        set(columns) <= set(meta.get('requested', []))
+
+
+def load_dataset(path, columns, interval, cache_dir=None, cursor=0, chunk_rows=100000):
+    """
+    Open a sensor history as a SensorDataStore.
+
+    Accepts CSV, Parquet, Arrow/Feather or an already converted .npy cache.
+    Sources are converted once into the cache directory and memory-mapped
+    from then on. Timing comes from a timestamp column when the source has
+    one, otherwise rows are spaced `interval` apart ending now.
+    """
+    if source_format(path) == 'npy':
+        values, meta = open_cache(path)
+    elif cache_dir is not None and _cache_is_fresh(path, cache_path(path, cache_dir), columns):
+        values, meta = open_cache(cache_path(path, cache_dir))
+    else:
+        values, meta = convert(path, columns, cache_dir, chunk_rows)
+
+    positions = {col: i for i, col in enumerate(meta['columns'])}
+    present = [col for col in columns if col in positions]
+    if present != meta['columns']:
+        # Only reorders or drops whole columns; the common case keeps the mapping.
+        # A memory-mapped dataset gets a reordered copy on disk next to it, reused while it is newer
+        order = [positions[col] for col in present]
+        if isinstance(values, np.memmap):
+            target = _selection_path(values.filename, present)
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(values.filename):
+                values = np.load(target, mmap_mode='r')
+            else:
+                values = _select_columns(values, order, values.shape[1], target, chunk_rows)
+        else:
+            values = _select_columns(values, order, values.shape[1], chunk_rows=chunk_rows)
+
+    if meta.get('first_timestamp'):
+        base_time = datetime.fromisoformat(meta['first_timestamp'])
+        if meta.get('interval_seconds'):
+            interval = timedelta(seconds=meta['interval_seconds'])
+    else:
+        # Timestamps for the simulation are derived from a base time and the sample interval
+        base_time = datetime.now() - timedelta(hours=meta['n_rows'])
+    path = values.filename if isinstance(values, np.memmap) else None
+    return SensorDataStore(present, values, base_time, interval, cursor, path)
+
+
+if __name__ == '__main__':
+    from utils.data_processing import DataProcessor
+
+    source = sys.argv[1] if len(sys.argv) > 1 else data_source()[0]
+    directory = sys.argv[2] if len(sys.argv) > 2 else (data_source()[1] or DEFAULT_CACHE_DIR)
+    processor = DataProcessor()
+    _, info = convert(source, processor.feature_columns + processor.fault_columns, directory)
+    print(f"Converted {info['n_rows']} rows x {len(info['columns'])} columns to {cache_path(source, directory)}")
@@ -0,0 +1,113 @@
+import re
+
+import numpy as np
+
+
+# Longest window accepted from clients, in hours (ten years)
+MAX_WINDOW_HOURS = 24 * 365 * 10
+
+
+def parse_window(text):
+    """
+    Parse a time window such as '24h' or '7d' into hours.
+    Returns None for 'all' or an empty value; windows longer than
+    MAX_WINDOW_HOURS raise ValueError.
+    """
+    if text is None or text == '' or text == 'all':
+        return None
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([hd]?)\s*', text.lower())
+    if not match:
+        raise ValueError(f"Invalid window '{text}', expected e.g. 24h or 7d")
+    value = float(match.group(1))
+    hours = value * 24 if match.group(2) == 'd' else value
+    if not np.isfinite(hours) or hours > MAX_WINDOW_HOURS:
+        raise ValueError(f"Window is longer than the maximum of {MAX_WINDOW_HOURS}h")
+    return hours
+
+
+class KPIAccumulator:
+    def __init__(self, fault_columns, sample_hours=2, capacity=1024):
+        """
+        Running fault statistics for maintenance KPIs.
+
+        Keeps prefix sums of faulty rows and of fault-episode starts (rising
+        edges) per fault column, so the KPIs for any window of rows cost the
+        same no matter how much history has been revealed.
+        """
+        self.fault_columns = list(fault_columns)
+        self.sample_hours = sample_hours
+        n = len(self.fault_columns)
+        self._faults = np.zeros((max(capacity, 1) + 1, n), dtype=np.int64)
+        self._starts = np.zeros_like(self._faults)
+        self._last = np.zeros(n, dtype=bool)
+        self.count = 0
+
+    def _ensure_capacity(self, size):
+        if size + 1 > len(self._faults):
+            new_size = max(size + 1, 2 * len(self._faults))
+            for name in ('_faults', '_starts'):
+                old = getattr(self, name)
+                grown = np.zeros((new_size, old.shape[1]), dtype=old.dtype)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+
+    def extend(self, fault_rows):
+        """Add a block of fault rows, oldest first"""
+        faulty = np.asarray(fault_rows) > 0
+        if faulty.ndim == 1:
+            faulty = faulty.reshape(1, -1)
+        if len(faulty) == 0:
+            return
+        start = self.count
+        end = start + len(faulty)
+        self._ensure_capacity(end)
+
+        previous = np.vstack([self._last, faulty[:-1]])
+        rising = faulty & ~previous
+        self._faults[start + 1:end + 1] = self._faults[start] + np.cumsum(faulty, axis=0)
+        self._starts[start + 1:end + 1] = self._starts[start] + np.cumsum(rising, axis=0)
+        self._last = faulty[-1].copy()
+        self.count = end
+
+    def append(self, fault_row):
+        """Add one fault row"""
+        self.extend(np.asarray(fault_row).reshape(1, -1))
+
+    def window_bounds(self, hours=None):
+        """Row range covering the last `hours` of revealed data, or everything"""
+        if hours is None or hours >= self.count * self.sample_hours:
+            return 0, self.count
+        rows = int(np.ceil(hours / self.sample_hours))
+        return max(0, self.count - rows), self.count
+
+    def kpis(self, fault_column, start=0, end=None):
+        """KPIs for one fault column over rows [start, end)"""
+        end = self.count if end is None else min(end, self.count)
+        start = min(max(start, 0), end)
+        i = self.fault_columns.index(fault_column)
+
+        operating_hours = (end - start) * self.sample_hours
+        total_faults = int(self._faults[end, i] - self._faults[start, i])
+        episodes = int(self._starts[end, i] - self._starts[start, i])
+        # An episode already running when the window opens still counts once
+        if start < end and start > 0 and self._faults[start + 1, i] > self._faults[start, i] \
+                and self._starts[start + 1, i] == self._starts[start, i]:
+            episodes += 1
+
+        downtime = total_faults * self.sample_hours
+        uptime = operating_hours - downtime
+        mtbf = uptime / max(1, episodes)
+        mttr = downtime / episodes if episodes else 0.0
+        availability = uptime / operating_hours * 100 if operating_hours else 0.0
+        reliability = ((operating_hours - total_faults) / operating_hours) * 100 if operating_hours else 0.0
+
+        return {
+            'MTBF': round(mtbf, 2),
+            'MTTR': round(mttr, 2),
+            'Availability': round(max(0, availability), 2),
+            'Reliability': round(max(0, reliability), 2),
+            'Total_Faults': total_faults,
+            'Failures': episodes,
+            'Downtime_Hours': downtime,
+            'Operating_Hours': operating_hours
+        }
@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+# Model groups and the folders they are loaded from
+MODEL_GROUPS = {
+    'breakdown': 'Breakdown',
+    'forecast': 'Forecast'
+}
+
+# Native XGBoost formats, preferred over a pickle with the same name
+NATIVE_EXTENSIONS = ('.ubj', '.json')
+
+# Retrained artifacts live in <group folder>/versions/<version>/, with the
+# version to serve named in versions/CURRENT
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+# Version names are plain folder names: no separators, and not '.' or '..'
+VERSION_PATTERN = re.compile(r'[\w.-]+')
+
+
+def model_name(filename):
+    """Registry name for a model file: 'rf_model.joblib' -> 'rf'"""
+    stem = os.path.splitext(filename)[0]
+    return stem[:-len('_model')] if stem.endswith('_model') else stem
+
+
+def version_path(directory, version):
+    """
+    Folder of a version of a group, or None unless `version` is a plain name
+    of an existing folder that resolves to somewhere inside versions/.
+    Version names reach this from clients, and every .joblib in the folder
+    gets unpickled, so nothing outside versions/ may be named.
+    """
+    if not isinstance(version, str) or not VERSION_PATTERN.fullmatch(version) or not version.strip('.'):
+        return None
+    versions = os.path.realpath(os.path.join(directory, VERSIONS_DIR))
+    path = os.path.realpath(os.path.join(versions, version))
+    if os.path.dirname(path) != versions or not os.path.isdir(path):
+        return None
+    return path
+
+
+def current_version(directory):
+    """Version named in a group folder's versions/CURRENT, or None to use the folder itself"""
+    try:
+        with open(os.path.join(directory, VERSIONS_DIR, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    if version and version_path(directory, version) is not None:
+        return version
+    return None
+
+
+def set_current_version(directory, version):
+    """Point a group folder at one of its versions; None goes back to the unversioned files"""
+    versions = os.path.join(directory, VERSIONS_DIR)
+    pointer = os.path.join(versions, CURRENT_FILE)
+    if version is None:
+        if os.path.exists(pointer):
+            os.remove(pointer)
+        return
+    if version_path(directory, version) is None:
+        raise ValueError(f"Unknown model version '{version}' in {versions}")
+    # Written aside and renamed, so a concurrent reader never sees a partial name
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(version + '\n')
+    os.replace(pointer + '.tmp', pointer)
+
+
+def read_manifest(directory, version):
+    """Manifest of a version, or None for the unversioned files or a version without one"""
+    path = version_path(directory, version) if version else None
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_versions(directory):
+    versions = os.path.join(directory, VERSIONS_DIR)
+    if not os.path.isdir(versions):
+        return []
+    return sorted(name for name in os.listdir(versions) if version_path(directory, name) is not None)
+
+
+def load_model_file(path, mmap_mode=None):
+    """Load one model, natively for XGBoost files and through joblib otherwise"""
+    if path.endswith(NATIVE_EXTENSIONS):
+        import xgboost
+        model = xgboost.XGBRegressor()
+        model.load_model(path)
+        return model
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+class ModelRegistry:
+    def __init__(self, base_path='models', lazy=(('breakdown', 'nn'),), max_workers=8, mmap_mode=None):
+        """
+        Loads the model files under `base_path` on a thread pool.
+
+        Models listed in `lazy` are only loaded on first use through get().
+        `mmap_mode` is passed to joblib.load so large arrays can be memory
+        mapped instead of copied into each worker. Per-model and total load
+        times are kept in `load_times` and `startup_seconds`.
+        """
+        self.base_path = base_path
+        self.lazy = set(lazy)
+        self.max_workers = max_workers
+        self.mmap_mode = mmap_mode
+        self.models = {group: {} for group in MODEL_GROUPS}
+        self.versions = {group: None for group in MODEL_GROUPS}
+        self.load_times = {}
+        self.errors = {}
+        self.startup_seconds = None
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """Map (group, name) to the file each model should be loaded from"""
+        paths = {}
+        for group, folder in MODEL_GROUPS.items():
+            directory = os.path.join(self.base_path, folder)
+            if not os.path.isdir(directory):
+                continue
+            self.versions[group] = current_version(directory)
+            if self.versions[group] is not None:
+                directory = os.path.join(directory, VERSIONS_DIR, self.versions[group])
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(('.joblib',) + NATIVE_EXTENSIONS) or filename == MANIFEST_FILE:
+                    continue
+                key = (group, model_name(filename))
+                # A native XGBoost file wins over the pickle of the same model
+                if key in paths and not filename.endswith(NATIVE_EXTENSIONS):
+                    continue
+                paths[key] = os.path.join(directory, filename)
+        return paths
+
+    def _load(self, key):
+        start = time.perf_counter()
+        try:
+            model = load_model_file(self._paths[key], self.mmap_mode)
+        except Exception as e:
+            self.errors['/'.join(key)] = str(e)
+            print(f"Error loading model {'/'.join(key)}: {e}")
+            return key, None
+        finally:
+            self.load_times['/'.join(key)] = time.perf_counter() - start
+        return key, model
+
+    def load(self):
+        """Load every eager model in parallel and return the nested models dict"""
+        start = time.perf_counter()
+        self._paths = self.discover()
+        eager = [key for key in self._paths if key not in self.lazy]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(eager)))) as pool:
+            for (group, name), model in pool.map(self._load, eager):
+                if model is not None:
+                    self.models[group][name] = model
+
+        self.startup_seconds = time.perf_counter() - start
+        print(f"Loaded {sum(len(m) for m in self.models.values())} models in {self.startup_seconds:.3f}s "
+              f"({len(self.lazy & set(self._paths))} deferred)")
+        return self.models
+
+    def get(self, group, name):
+        """Return a model, loading it first if it was deferred"""
+        model = self.models[group].get(name)
+        if model is not None or (group, name) not in self._paths:
+            return model
+        with self._lock:
+            if name not in self.models[group]:
+                _, model = self._load((group, name))
+                if model is not None:
+                    self.models[group][name] = model
+        return self.models[group].get(name)
+
+    @property
+    def version(self):
+        """Loaded versions of every group as one string, 'base' for unversioned files"""
+        return ','.join(f'{group}={self.versions[group] or "base"}' for group in sorted(self.versions))
+
+    def stats(self):
+        return {
+            'startup_seconds': self.startup_seconds,
+            'versions': dict(self.versions),
+            'load_times': dict(self.load_times),
+            'loaded': {group: sorted(models) for group, models in self.models.items()},
+            'deferred': sorted('/'.join(key) for key in self.lazy
+                               if key in self._paths and key[1] not in self.models[key[0]]),
+            'errors': dict(self.errors)
+        }
+
+
+class ModelPool:
+    def __init__(self, registry):
+        """
+        Model instances shared by every asset stream, plus objects derived
+        from them (such as compiled models) that should only be built once.
+        """
+        self.registry = registry
+        self.models = registry.models
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key, build):
+        """Return the object stored under `key`, building it on first use"""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+
+def export_native(base_path='models'):
+    """
+    Write every pickled XGBoost model next to its pickle in the native UBJSON
+    format, which ModelRegistry then loads instead of unpickling.
+    """
+    import xgboost
+    registry = ModelRegistry(base_path, lazy=())
+    for (group, name), path in registry.discover().items():
+        if not path.endswith('.joblib'):
+            continue
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            print(f"Skipping {group}/{name}: {e}")
+            continue
+        if isinstance(model, xgboost.XGBModel):
+            target = os.path.splitext(path)[0] + '.ubj'
+            model.save_model(target)
+            print(f"Exported {group}/{name} -> {target}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        export_native(sys.argv[2] if len(sys.argv) > 2 else 'models')
+    else:
+        registry = ModelRegistry(sys.argv[1] if len(sys.argv) > 1 else 'models')
+        registry.load()
+        for key, seconds in sorted(registry.load_times.items(), key=lambda item: -item[1]):
+            print(f"{key:40s} {seconds * 1000:8.1f} ms")
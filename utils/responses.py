@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+MIN_COMPRESS_BYTES = 1024  # smaller bodies are not worth a compression pass
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value):
+    """Values the encoders do not handle natively"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """
+    Encode a payload to JSON bytes, with keys sorted like Flask's jsonify.
+
+    NumPy arrays and scalars may be passed as they are; orjson serializes
+    contiguous numeric arrays without building Python lists. Without orjson
+    the standard json module is used, converting arrays through tolist().
+    orjson writes NaN as null, the json module as NaN.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':'), sort_keys=True).encode()
+
+
+def supported_encodings():
+    """Content codings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Best coding the client accepts, from a werkzeug Accept-Encoding header
+    (request.accept_encodings); None for an uncompressed body.
+    """
+    best, best_quality = None, 0
+    for encoding in supported_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def encode(payload, encoding=None, min_size=MIN_COMPRESS_BYTES):
+    """JSON body for a payload, compressed when large enough; returns (body, content coding or None)"""
+    body = dumps(payload)
+    if encoding is None or len(body) < min_size:
+        return body, None
+    return compress(body, encoding), encoding
+
+
+def make_etag(*parts):
+    """Opaque validator for a response determined by `parts`"""
+    return hashlib.blake2b('|'.join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
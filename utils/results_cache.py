@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+# Results computed on demand kept per index, beyond the published ones
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResultsCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Latest computed results, valid for a single simulation index.
+
+        The simulation thread publishes a fresh snapshot after every tick;
+        request handlers read from it and only compute on a miss. Published
+        results are always kept, while results computed on a miss depend on
+        request parameters, so only the `max_entries` most recently used of
+        them are kept.
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.index = None
+        self._results = OrderedDict()
+        self._published = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _store(self, index, results, published):
+        if self.index is not None and index < self.index:
+            return
+        if index != self.index:
+            self._results = OrderedDict()
+            self._published = set()
+        self.index = index
+        for key, value in results.items():
+            self._results[key] = value
+            self._results.move_to_end(key)
+        if published:
+            self._published.update(results)
+            return
+        excess = len(self._results) - len(self._published) - self.max_entries
+        for key in list(self._results):
+            if excess <= 0:
+                break
+            if key not in self._published:
+                del self._results[key]
+                self.evictions += 1
+                excess -= 1
+
+    def publish(self, index, results):
+        """Replace the snapshot with results computed for `index`"""
+        with self._lock:
+            self._store(index, results, published=True)
+
+    def clear(self):
+        """Drop every result, published ones included"""
+        with self._lock:
+            self.index = None
+            self._results = OrderedDict()
+            self._published = set()
+
+    def get(self, index, key, compute):
+        """Return the cached result for (index, key), computing and storing it on a miss"""
+        with self._lock:
+            if index == self.index and key in self._results:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return self._results[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._store(index, {key: value}, published=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'index': self.index,
+                'entries': len(self._results),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
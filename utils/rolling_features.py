@@ -0,0 +1,243 @@
+from collections import deque
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+
+def feature_names(columns, window_sizes, lags=(1, 24)):
+    """Names of the rolling features, in the order both engines produce them"""
+    names = []
+    for col in columns:
+        for w in window_sizes:
+            names += [f'{col}_mean_{w}h', f'{col}_std_{w}h', f'{col}_min_{w}h', f'{col}_max_{w}h']
+        names += [f'{col}_lag_{lag}' for lag in lags]
+        names.append(f'{col}_roc')
+    return names
+
+
+def _window_moments(sums, squares, n):
+    """Mean offset and sample std of a window from its shifted sum and sum of squares"""
+    mean = sums / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - sums * sums / n) / (n - 1)
+    variance = np.where(n > 1, np.maximum(variance, 0), np.nan)
+    return mean, np.sqrt(variance)
+
+
+def rolling_feature_matrix(values, window_sizes=(24,), lags=(1, 24)):
+    """
+    Batch rolling features for every row of `values` (n_rows, n_columns).
+
+    Rolling mean/std come from prefix sums of the values shifted by their
+    first row, min/max from running min/max filters, all with min_periods=1. Gaps are
+    forward filled, then zero filled, as in calculate_statistical_features.
+    Uses the same arithmetic as StreamingFeatureEngine, so both produce
+    identical output.
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_columns = values.shape
+    per_column = 4 * len(window_sizes) + len(lags) + 1
+    # Column-major, since the features are written one column at a time
+    out = np.empty((n_rows, n_columns * per_column), order='F')
+    if n_rows == 0:
+        return out
+
+    shifted = values - values[0]
+    prefix = np.zeros((n_rows + 1, n_columns))
+    prefix_sq = np.zeros((n_rows + 1, n_columns))
+    np.cumsum(shifted, axis=0, out=prefix[1:])
+    np.cumsum(shifted * shifted, axis=0, out=prefix_sq[1:])
+    rows = np.arange(n_rows)
+
+    blocks = []
+    for w in window_sizes:
+        starts = np.maximum(0, rows - w + 1)
+        n = (rows - starts + 1).astype(float).reshape(-1, 1)
+        mean, std = _window_moments(prefix[rows + 1] - prefix[starts], prefix_sq[rows + 1] - prefix_sq[starts], n)
+        mean = values[0] + mean
+
+        # Trailing windows: shift the filter so each window ends at its row
+        minimum = minimum_filter1d(values, w, axis=0, mode='constant', cval=np.inf, origin=(w - 1) // 2)
+        maximum = maximum_filter1d(values, w, axis=0, mode='constant', cval=-np.inf, origin=(w - 1) // 2)
+        blocks.append((mean, std, minimum, maximum))
+
+    lagged = []
+    for lag in lags:
+        shifted_values = np.full_like(values, np.nan)
+        if lag < n_rows:
+            shifted_values[lag:] = values[:-lag]
+        lagged.append(shifted_values)
+
+    previous = np.vstack([np.full((1, n_columns), np.nan), values[:-1]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roc = values / previous - 1
+
+    position = 0
+    for j in range(n_columns):
+        for block in blocks:
+            for stat in block:
+                out[:, position] = stat[:, j]
+                position += 1
+        for shifted_values in lagged:
+            out[:, position] = shifted_values[:, j]
+            position += 1
+        out[:, position] = roc[:, j]
+        position += 1
+
+    return _forward_fill(out)
+
+
+def _forward_fill(matrix):
+    """Replace NaNs with the last valid value above them, or 0 if there is none"""
+    valid = ~np.isnan(matrix)
+    if valid.all():
+        return matrix
+    source = np.where(valid, np.arange(len(matrix)).reshape(-1, 1), 0)
+    np.maximum.accumulate(source, axis=0, out=source)
+    filled = np.take_along_axis(matrix, source, axis=0)
+    filled[np.isnan(filled)] = 0
+    return filled
+
+
+class StreamingFeatureEngine:
+    def __init__(self, columns, window_sizes=(6, 24, 168), lags=(1, 24)):
+        """
+        Rolling statistics, lags and rate of change updated one row at a time.
+
+        Mean/std use running prefix sums kept in a ring buffer and min/max use
+        monotonic deques, so each row costs O(1) amortized per column and
+        window. Output matches rolling_feature_matrix exactly.
+        """
+        self.columns = list(columns)
+        self.window_sizes = list(window_sizes)
+        self.lags = list(lags)
+        self.feature_names = feature_names(self.columns, self.window_sizes, self.lags)
+        n_columns = len(self.columns)
+
+        self._ring_size = max(self.window_sizes + self.lags) + 1
+        self._prefix = np.zeros((self._ring_size, n_columns))
+        self._prefix_sq = np.zeros((self._ring_size, n_columns))
+        self._values = np.full((self._ring_size, n_columns), np.nan)
+        self._origin = None
+        self._min_deques = [[deque() for _ in self.window_sizes] for _ in self.columns]
+        self._max_deques = [[deque() for _ in self.window_sizes] for _ in self.columns]
+        self._last_valid = np.zeros(len(self.feature_names))
+        self.latest = None
+        self.count = 0
+
+    def append(self, row):
+        """Add one row and return its feature vector"""
+        row = np.asarray(row, dtype=float)
+        t = self.count
+        size = self._ring_size
+        if self._origin is None:
+            self._origin = row.copy()
+
+        shifted = row - self._origin
+        self._prefix[(t + 1) % size] = self._prefix[t % size] + shifted
+        self._prefix_sq[(t + 1) % size] = self._prefix_sq[t % size] + shifted * shifted
+        previous = self._values[(t - 1) % size] if t > 0 else np.full(len(self.columns), np.nan)
+        self._values[t % size] = row
+
+        moments = []
+        for k, w in enumerate(self.window_sizes):
+            start = max(0, t - w + 1)
+            n = np.full(len(self.columns), float(t - start + 1))
+            mean, std = _window_moments(
+                self._prefix[(t + 1) % size] - self._prefix[start % size],
+                self._prefix_sq[(t + 1) % size] - self._prefix_sq[start % size],
+                n
+            )
+            moments.append((self._origin + mean, std))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            roc = row / previous - 1
+
+        features = np.empty(len(self.feature_names))
+        position = 0
+        for j, value in enumerate(row):
+            for k, w in enumerate(self.window_sizes):
+                low = self._min_deques[j][k]
+                high = self._max_deques[j][k]
+                while low and low[-1][1] >= value:
+                    low.pop()
+                low.append((t, value))
+                while high and high[-1][1] <= value:
+                    high.pop()
+                high.append((t, value))
+                while low[0][0] <= t - w:
+                    low.popleft()
+                while high[0][0] <= t - w:
+                    high.popleft()
+
+                mean, std = moments[k]
+                features[position:position + 4] = (mean[j], std[j], low[0][1], high[0][1])
+                position += 4
+            for lag in self.lags:
+                features[position] = self._values[(t - lag) % size, j] if t >= lag else np.nan
+                position += 1
+            features[position] = roc[j]
+            position += 1
+
+        # Forward fill gaps from the previous row, zero before the first value
+        gaps = np.isnan(features)
+        features[gaps] = self._last_valid[gaps]
+        self._last_valid = features
+
+        self.count += 1
+        self.latest = features
+        return features
+
+    def prime(self, rows):
+        """
+        Load a block of history in one vectorized pass.
+
+        Only the state the next append needs is rebuilt: the tail of the
+        prefix sums and values, the min/max deques and the last feature row.
+        """
+        rows = np.asarray(rows, dtype=float)
+        if self.count or len(rows) == 0:
+            return self.extend(rows)
+
+        n_rows = len(rows)
+        size = self._ring_size
+        features = rolling_feature_matrix(rows, self.window_sizes, self.lags)
+
+        self._origin = rows[0].copy()
+        shifted = rows - self._origin
+        prefix = np.zeros((n_rows + 1, len(self.columns)))
+        prefix_sq = np.zeros((n_rows + 1, len(self.columns)))
+        np.cumsum(shifted, axis=0, out=prefix[1:])
+        np.cumsum(shifted * shifted, axis=0, out=prefix_sq[1:])
+        for k in range(max(0, n_rows + 1 - size), n_rows + 1):
+            self._prefix[k % size] = prefix[k]
+            self._prefix_sq[k % size] = prefix_sq[k]
+        for t in range(max(0, n_rows - size), n_rows):
+            self._values[t % size] = rows[t]
+
+        for k, w in enumerate(self.window_sizes):
+            for t in range(max(0, n_rows - w), n_rows):
+                for j, value in enumerate(rows[t]):
+                    low = self._min_deques[j][k]
+                    high = self._max_deques[j][k]
+                    while low and low[-1][1] >= value:
+                        low.pop()
+                    low.append((t, value))
+                    while high and high[-1][1] <= value:
+                        high.pop()
+                    high.append((t, value))
+
+        self._last_valid = features[-1].copy()
+        self.latest = self._last_valid
+        self.count = n_rows
+        return features
+
+    def extend(self, rows):
+        """Add several rows, oldest first, and return their feature vectors"""
+        return np.array([self.append(row) for row in rows]).reshape(-1, len(self.feature_names))
+
+    def latest_features(self):
+        """Feature vector of the most recent row as a name -> value mapping"""
+        if self.latest is None:
+            return {}
+        return dict(zip(self.feature_names, self.latest.tolist()))
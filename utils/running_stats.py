@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class RunningStats:
+    def __init__(self, n_features):
+        """
+        Welford running mean and variance for several series at once.
+
+        Each update is O(n_features) and the result matches the sample
+        statistics (ddof=1) of everything seen so far.
+        """
+        self.n_features = n_features
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+
+    def update(self, row):
+        """Add one observation per series"""
+        row = np.asarray(row, dtype=float)
+        self.count += 1
+        delta = row - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (row - self.mean)
+
+    def extend(self, rows):
+        """Add a block of observations, merged in one vectorized step"""
+        rows = np.asarray(rows, dtype=float)
+        if len(rows) == 0:
+            return
+        n = len(rows)
+        block_mean = rows.mean(axis=0)
+        block_m2 = ((rows - block_mean) ** 2).sum(axis=0)
+
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + block_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.full(self.n_features, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+def expanding_mean_std(values):
+    """
+    Mean and sample std of every prefix of `values`, computed in one pass.
+    Row t of each result describes rows 0..t.
+    """
+    values = np.asarray(values, dtype=float)
+    n = np.arange(1, len(values) + 1).reshape(-1, 1)
+    # Shift by the first row to keep the running sums small
+    shifted = values - values[:1]
+    sums = np.cumsum(shifted, axis=0)
+    squares = np.cumsum(shifted ** 2, axis=0)
+    mean = values[:1] + sums / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - sums ** 2 / n) / (n - 1)
+    variance = np.where(n > 1, np.maximum(variance, 0), np.nan)
+    return mean, np.sqrt(variance)
@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from utils.data_store import SensorDataStore
+
+# Columns of the per-asset control table
+CURSOR, RUNNING, INTERVAL_MS = range(3)
+HEADER_BYTES = 8
+ALIGNMENT = 64
+
+
+def _align(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _open_segment(name):
+    """Attach to an existing segment without letting this process's resource tracker unlink it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+class SharedState:
+    def __init__(self, segment, header, owner=False):
+        """
+        Sensor history and per-asset simulation control shared between processes.
+
+        Segment layout: an 8-byte header length, a JSON header (columns,
+        timing, asset slots and offsets) and an int64 control table with a
+        cursor, running flag and tick interval per asset. A history loaded
+        from a .npy cache stays there: the header names the file and every
+        process memory-maps it read-only, so the page cache is shared and
+        data larger than RAM still works. Only a history held in memory is
+        copied into the segment, after the table, as a float64
+        (n_columns, n_rows) array.
+        """
+        self.segment = segment
+        self.name = segment.name
+        self.header = header
+        self.owner = owner
+        self.columns = header['columns']
+        self.asset_ids = header['asset_ids']
+        self._slots = {asset_id: i for i, asset_id in enumerate(self.asset_ids)}
+        self.table = np.ndarray((len(self.asset_ids), 3), dtype=np.int64,
+                                buffer=segment.buf, offset=header['table_offset'])
+        shape = (len(self.columns), header['n_rows'])
+        if header.get('values_path'):
+            self.values = np.load(header['values_path'], mmap_mode='r')
+            if self.values.shape != shape:
+                raise ValueError(f"{header['values_path']} holds {self.values.shape} values, expected {shape}")
+        else:
+            self.values = np.ndarray(shape, dtype=np.float64, buffer=segment.buf, offset=header['values_offset'])
+        self.dataset = SharedDataStore(self)
+
+    @classmethod
+    def create(cls, dataset, asset_ids, start_index=0, name=None):
+        """
+        Share a SensorDataStore through a new segment, with every asset's cursor at start_index.
+        A memory-mapped store is shared by its file; any other is copied into the segment.
+        """
+        n_columns, n_rows = len(dataset.columns), dataset.total_rows
+        asset_ids = list(asset_ids)
+        header = {
+            'columns': dataset.columns,
+            'asset_ids': asset_ids,
+            'n_rows': n_rows,
+            'base_time': dataset.base_time.isoformat(),
+            'interval_seconds': dataset.interval.total_seconds(),
+            'values_path': dataset.path
+        }
+        # Offsets are fixed up once the header size is known
+        header_size = _align(HEADER_BYTES + len(json.dumps(header)) + 64)
+        header['table_offset'] = header_size
+        header['values_offset'] = header_size + _align(len(asset_ids) * 3 * 8)
+        encoded = json.dumps(header).encode()
+
+        size = header['values_offset'] + (0 if dataset.path else max(n_columns * n_rows * 8, 1))
+        segment = shared_memory.SharedMemory(name=name or f'pm_{uuid.uuid4().hex[:12]}', create=True, size=size)
+        segment.buf[:HEADER_BYTES] = len(encoded).to_bytes(HEADER_BYTES, 'little')
+        segment.buf[HEADER_BYTES:HEADER_BYTES + len(encoded)] = encoded
+
+        state = cls(segment, header, owner=True)
+        if n_rows and not dataset.path:
+            history = dataset.fork(cursor=n_rows).snapshot()
+            # One zero-copy column at a time, so no second full copy is built on the way
+            for i, column in enumerate(dataset.columns):
+                state.values[i] = history.column(column)
+        state.table[:] = 0
+        state.table[:, CURSOR] = min(start_index, n_rows)
+        return state
+
+    @classmethod
+    def attach(cls, name):
+        """Map a segment created by another process"""
+        segment = _open_segment(name)
+        length = int.from_bytes(bytes(segment.buf[:HEADER_BYTES]), 'little')
+        header = json.loads(bytes(segment.buf[HEADER_BYTES:HEADER_BYTES + length]))
+        return cls(segment, header)
+
+    def slot(self, asset_id):
+        return self._slots[asset_id]
+
+    def close(self):
+        # Views into the buffer must go before the segment can be closed
+        self.table = self.values = self.dataset = None
+        self.segment.close()
+
+    def unlink(self):
+        """Remove the segment; only the creating process should do this"""
+        self.close()
+        if self.owner:
+            self.segment.unlink()
+
+
+class SharedDataStore(SensorDataStore):
+    shared = True
+
+    def __init__(self, state, slot=None):
+        """
+        SensorDataStore over a SharedState segment.
+
+        The dataset itself has no slot. fork(asset_id=...) returns the store
+        of one asset, whose cursor and running flag live in the control
+        table and are advanced by the owner process.
+        """
+        super().__init__(
+            state.columns,
+            # A separate view, so marking it read-only leaves the owner's array writable
+            state.values.view(),
+            datetime.fromisoformat(state.header['base_time']),
+            timedelta(seconds=state.header['interval_seconds'])
+        )
+        self.state = state
+        self.slot = slot
+
+    def fork(self, cursor=0, asset_id=None):
+        """The store of one asset; its cursor comes from the shared table, not `cursor`"""
+        return SharedDataStore(self.state, self.state.slot(asset_id))
+
+    @property
+    def cursor(self):
+        if self.slot is None:
+            return self.total_rows
+        return min(int(self.state.table[self.slot, CURSOR]), self.total_rows)
+
+    def advance(self, rows=1):
+        """Only the owner process moves shared cursors"""
+        return self.cursor
+
+    @property
+    def running(self):
+        return bool(self.state.table[self.slot, RUNNING])
+
+    def set_running(self, running, interval=None):
+        """Ask the owner process to start or stop advancing this asset"""
+        if interval is not None:
+            self.state.table[self.slot, INTERVAL_MS] = int(interval * 1000)
+        self.state.table[self.slot, RUNNING] = int(running)
+
+
+class SharedStateOwner:
+    def __init__(self, state, poll_interval=0.05):
+        """
+        Advances the shared cursors of running assets at their tick interval.
+        Runs in exactly one process, normally the gunicorn master.
+        """
+        self.state = state
+        self.poll_interval = poll_interval
+        self._due = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='shared-state-owner')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def step(self, now):
+        """Advance every asset whose next tick is due"""
+        table = self.state.table
+        n_rows = self.state.header['n_rows']
+        for slot in np.flatnonzero(table[:, RUNNING]):
+            interval = max(int(table[slot, INTERVAL_MS]), 1) / 1000
+            due = self._due.setdefault(slot, now + interval)
+            if now < due:
+                continue
+            if table[slot, CURSOR] < n_rows:
+                table[slot, CURSOR] += 1
+            if table[slot, CURSOR] >= n_rows:
+                table[slot, RUNNING] = 0
+            self._due[slot] = max(due + interval, now)
+        # Forget stopped assets so a restart waits a full interval again
+        for slot in [slot for slot in self._due if not table[slot, RUNNING]]:
+            del self._due[slot]
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.step(time.monotonic())
+            self._stop.wait(self.poll_interval)
+
+
+def follow(registry, poll_interval=0.25):
+    """
+    Keep a worker's streams in step with the shared cursors, so each worker
+    pushes ticks to its own Socket.IO clients.
+    """
+    def run():
+        while True:
+            for stream in registry.streams().values():
+                try:
+                    if stream.sync():
+                        stream.notify('tick', stream.tick_message())
+                except Exception as e:
+                    print(f"Error following shared state: {e}")
+            time.sleep(poll_interval)
+
+    thread = threading.Thread(target=run, name='shared-state-follower')
+    thread.daemon = True
+    thread.start()
+    return thread
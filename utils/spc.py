@@ -0,0 +1,192 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+from utils.running_stats import RunningStats
+
+# d2 constant for moving ranges of two consecutive points
+D2 = 1.128
+# Most recent anomaly events kept in the log, overall and per tag
+MAX_EVENTS = 10000
+
+
+def capability_indices(mean, within_std, overall_std, usl=None, lsl=None):
+    """
+    Process capability from summary statistics.
+    Cp/Cpk use the within (moving range) sigma, Pp/Ppk the overall sigma.
+    """
+    indices = {'Cp': None, 'Cpk': None, 'Pp': None, 'Ppk': None}
+    if usl is None or lsl is None:
+        return indices
+
+    for prefix, sigma in (('C', within_std), ('P', overall_std)):
+        if sigma is None or not np.isfinite(sigma) or sigma <= 0:
+            continue
+        indices[f'{prefix}p'] = (usl - lsl) / (6 * sigma)
+        indices[f'{prefix}pk'] = min((usl - mean) / (3 * sigma), (mean - lsl) / (3 * sigma))
+    indices.update({'USL': usl, 'LSL': lsl})
+    return indices
+
+
+class StreamingSPC:
+    def __init__(self, columns, z_threshold=3, ewma_lambda=0.2, ewma_width=3,
+                 cusum_k=0.5, cusum_h=5, capacity=1024, max_events=MAX_EVENTS):
+        """
+        Online statistical process control for several tags at once.
+
+        Every update is vectorized across tags and costs O(n_tags): running
+        mean/std (Welford), mean moving range, EWMA and two-sided tabular
+        CUSUM. Each new row is judged against the statistics of the rows
+        before it, and signals are appended to an anomaly log that keeps
+        the latest `max_events`, overall and for each tag.
+        """
+        self.columns = list(columns)
+        n = len(self.columns)
+        self.z_threshold = z_threshold
+        self.ewma_lambda = ewma_lambda
+        self.ewma_width = ewma_width
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+
+        self.stats = RunningStats(n)
+        self._last = None
+        self._mr_sum = np.zeros(n)
+        self.ewma = np.zeros(n)
+        self.cusum_pos = np.zeros(n)
+        self.cusum_neg = np.zeros(n)
+        self._flags = np.zeros((max(capacity, 1), n), dtype=bool)
+        self.events = deque(maxlen=max_events)
+        self._events_by_parameter = {column: deque(maxlen=max_events) for column in self.columns}
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _ensure_capacity(self, size):
+        if size > len(self._flags):
+            grown = np.zeros((max(size, 2 * len(self._flags)), self._flags.shape[1]), dtype=bool)
+            grown[:self.count] = self._flags[:self.count]
+            self._flags = grown
+
+    def extend(self, rows):
+        """Add several rows, oldest first"""
+        for row in np.asarray(rows, dtype=float):
+            self.update(row)
+
+    def update(self, row):
+        """Add one row, returning the anomaly events it raised"""
+        row = np.asarray(row, dtype=float)
+        with self._lock:
+            index = self.count
+            events = []
+            mean = self.stats.mean.copy()
+            std = self.stats.std
+
+            if self.stats.count >= 2:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    z = np.where(std > 0, (row - mean) / std, 0.0)
+                events += self._signals(index, row, z, np.abs(z) > self.z_threshold, 'zscore')
+
+                # EWMA against the limits of the in-control mean so far
+                self.ewma = self.ewma_lambda * row + (1 - self.ewma_lambda) * self.ewma
+                ewma_sigma = std * np.sqrt(self.ewma_lambda / (2 - self.ewma_lambda)
+                                           * (1 - (1 - self.ewma_lambda) ** (2 * (index + 1))))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    ewma_z = np.where(ewma_sigma > 0, (self.ewma - mean) / ewma_sigma, 0.0)
+                events += self._signals(index, self.ewma, ewma_z, np.abs(ewma_z) > self.ewma_width, 'ewma')
+
+                self.cusum_pos = np.maximum(0, self.cusum_pos + z - self.cusum_k)
+                self.cusum_neg = np.maximum(0, self.cusum_neg - z - self.cusum_k)
+                up = self.cusum_pos > self.cusum_h
+                down = self.cusum_neg > self.cusum_h
+                events += self._signals(index, self.cusum_pos, self.cusum_pos, up, 'cusum_up')
+                events += self._signals(index, self.cusum_neg, self.cusum_neg, down, 'cusum_down')
+                # Restart the CUSUM once it has signalled
+                self.cusum_pos[up] = 0
+                self.cusum_neg[down] = 0
+            else:
+                self.ewma = row.copy() if self.stats.count == 0 else \
+                    self.ewma_lambda * row + (1 - self.ewma_lambda) * self.ewma
+
+            if self._last is not None:
+                self._mr_sum += np.abs(row - self._last)
+            self._last = row
+            self.stats.update(row)
+
+            self._ensure_capacity(index + 1)
+            for event in events:
+                self._flags[index, self.columns.index(event['parameter'])] = True
+            self.events.extend(events)
+            for event in events:
+                self._events_by_parameter[event['parameter']].append(event)
+            self.count += 1
+        return events
+
+    def _signals(self, index, values, statistics, mask, rule):
+        return [
+            {
+                'index': index,
+                'parameter': self.columns[j],
+                'rule': rule,
+                'value': float(values[j]),
+                'statistic': round(float(statistics[j]), 4)
+            }
+            for j in np.flatnonzero(mask)
+        ]
+
+    def state(self, parameter, usl=None, lsl=None):
+        """Control limits, EWMA/CUSUM state and capability for one tag"""
+        with self._lock:
+            j = self.columns.index(parameter)
+            mean = float(self.stats.mean[j])
+            std = float(self.stats.std[j]) if self.stats.count >= 2 else None
+            mr_mean = float(self._mr_sum[j] / (self.count - 1)) if self.count >= 2 else None
+            within_std = mr_mean / D2 if mr_mean is not None else None
+            ewma = float(self.ewma[j])
+            cusum_pos = float(self.cusum_pos[j])
+            cusum_neg = float(self.cusum_neg[j])
+            count = self.count
+
+        sigma = std or 0.0
+        ewma_sigma = sigma * np.sqrt(self.ewma_lambda / (2 - self.ewma_lambda))
+        state = {
+            'parameter': parameter,
+            'count': count,
+            'center_line': mean,
+            'std': std,
+            'ucl': mean + 3 * sigma,
+            'lcl': mean - 3 * sigma,
+            'uwl': mean + 2 * sigma,
+            'lwl': mean - 2 * sigma,
+            'mr_mean': mr_mean,
+            'ewma': ewma,
+            'ewma_ucl': mean + self.ewma_width * ewma_sigma,
+            'ewma_lcl': mean - self.ewma_width * ewma_sigma,
+            'cusum_pos': cusum_pos,
+            'cusum_neg': cusum_neg,
+            'cusum_h': self.cusum_h
+        }
+        state.update(capability_indices(mean, within_std, std, usl, lsl))
+        return state
+
+    def flags(self, parameter, start=0, end=None):
+        """Whether each row in [start, end) raised any signal for the tag"""
+        with self._lock:
+            end = self.count if end is None else min(end, self.count)
+            start = min(max(start, 0), end)
+            return self._flags[start:end, self.columns.index(parameter)].copy()
+
+    def anomalies(self, since=0, parameter=None, limit=None):
+        """
+        The last `limit` logged events for rows at or after `since`, oldest first.
+        The log is walked back from the newest event, so a request costs
+        O(limit) however long the log is.
+        """
+        with self._lock:
+            log = self.events if parameter is None else self._events_by_parameter.get(parameter, ())
+            events = []
+            for event in reversed(log):
+                if event['index'] < since or (limit is not None and len(events) >= limit):
+                    break
+                events.append(event)
+        events.reverse()
+        return events